@@ -0,0 +1,27 @@
+from data_access.changes import change_events
+from data_access.connection import get_db, start_background_jobs
+from data_access.instrumentation import io_debug_panel, start_io_log, write_io_log
+from data_access.jobs import list_jobs, retry_job
+from data_access.tables import (
+    cache_stats,
+    clear_table_cache,
+    diff_rows,
+    fetch_table_data,
+    fetch_table_query,
+    insert_rows,
+    last_load_times,
+    load_tables,
+    resync_table_mirror,
+    update_rows,
+    upsert_rows,
+)
+from data_access.aggregates import (
+    dk_leaderboard,
+    rapsodo_hitting_leaderboard,
+    rapsodo_id_text,
+    rapsodo_release_leaderboard,
+)
+from data_access.identity import get_identity
+from data_access.ingest import FILE_TYPES, backfill_pitching, detect_file_type, enqueue_upload, ingest_files, read_header
+from data_access.roster import ACTIVE_CLASSES, CLASS_NAMES, get_roster
+from data_access.summaries import fetch_summaries, rebuild_summaries, summary_stats
@@ -0,0 +1,147 @@
+#%% Imports
+
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from data_access.connection import get_db
+from data_access.settings import server_aggregates
+from data_access.summaries import fetch_summaries, summary_stats
+from data_access.tables import cached_fetch
+
+#%% Helpers
+
+# RPC functions (sql/leaderboards.sql) found missing on the server; those fall back to pandas for the life of the process
+_unavailable = set()
+
+# Rapsodo ids come back as ints, floats or text depending on the table; compare them as plain text
+def rapsodo_id_text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+# Run a leaderboard RPC, caching the result under the source table so writes to it clear the entry.
+# Returns None when the function isn't installed or server aggregation is switched off.
+def run_rpc(function_name, source_table, params):
+    if not server_aggregates() or function_name in _unavailable:
+        return None
+
+    key = (source_table, function_name, tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+
+    try:
+        df = cached_fetch(key, lambda: pd.DataFrame(get_db().client.rpc(function_name, params).execute().data))
+    except APIError as error:
+        # PGRST202: no such function, i.e. sql/leaderboards.sql hasn't been loaded
+        if error.code == "PGRST202":
+            _unavailable.add(function_name)
+        return None
+
+    return df.copy(deep=False)
+
+def date_params(start_date, end_date):
+    return {
+        "start_date": pd.to_datetime(start_date).strftime('%Y-%m-%d'),
+        "end_date": pd.to_datetime(end_date).strftime('%Y-%m-%d'),
+    }
+
+#%% Diamond Kinetics
+
+DK_COLUMNS = [
+    'player_id',
+    'hand_speed_max', 'hand_speed_avg', 'hand_speed_90', 'hand_speed_std',
+    'barrel_speed_max', 'barrel_speed_avg', 'barrel_speed_90', 'barrel_speed_std',
+    'attack_angle_avg', 'attack_angle_std',
+    'impact_momentum_avg', 'impact_momentum_std',
+    'trigger_to_impact_avg', 'trigger_to_impact_std',
+    'hand_cast_avg', 'hand_cast_std',
+    'barrel_x_avg', 'barrel_x_std',
+    'barrel_y_avg', 'barrel_y_std',
+    'barrel_z_avg', 'barrel_z_std',
+]
+
+# pandas path: combine the players' daily summaries (summaries.py)
+def dk_leaderboard_frame(start_date, end_date, player_ids):
+    stats = summary_stats(fetch_summaries('swings', player_ids, start_date, end_date), ['player'])
+    if stats.empty:
+        return pd.DataFrame(columns=DK_COLUMNS)
+
+    columns = {'player': 'player_id'}
+    for metric, name in [('max_hand_speed', 'hand_speed'), ('max_barrel_speed', 'barrel_speed'),
+                         ('attack_angle', 'attack_angle'), ('impact_momentum', 'impact_momentum'),
+                         ('trigger_to_impact', 'trigger_to_impact'), ('hand_cast', 'hand_cast'),
+                         ('barrel_x', 'barrel_x'), ('barrel_y', 'barrel_y'), ('barrel_z', 'barrel_z')]:
+        columns.update({f"{metric}_max": f"{name}_max", f"{metric}_mean": f"{name}_avg",
+                        f"{metric}_90": f"{name}_90", f"{metric}_std": f"{name}_std"})
+    stats = stats.rename(columns=columns).reindex(columns=DK_COLUMNS)
+    return stats.assign(player_id=stats['player_id'].astype(int))
+
+# One row per player: DK_COLUMNS, from the dk_leaderboard RPC or the pandas fallback
+def dk_leaderboard(start_date, end_date, player_ids):
+    player_ids = [int(player_id) for player_id in player_ids]
+
+    params = date_params(start_date, end_date)
+    params["player_ids"] = player_ids
+    df = run_rpc("dk_leaderboard", "swings", params)
+
+    if df is None:
+        return dk_leaderboard_frame(start_date, end_date, player_ids)
+
+    if df.empty:
+        return pd.DataFrame(columns=DK_COLUMNS)
+    return df[DK_COLUMNS]
+
+#%% Rapsodo Hitting
+
+RAPSODO_HITTING_COLUMNS = ['rapsodo_id', 'ExitVelocity_max', 'ExitVelocity_avg', 'ExitVelocity_90th_percentile']
+
+def rapsodo_hitting_leaderboard_frame(start_date, end_date, rapsodo_ids):
+    stats = summary_stats(fetch_summaries('rapsodo_hitting', rapsodo_ids, start_date, end_date), ['player'])
+    return stats.rename(columns={
+        'player': 'rapsodo_id',
+        'ExitVelocity_mean': 'ExitVelocity_avg',
+        'ExitVelocity_90': 'ExitVelocity_90th_percentile',
+    }).reindex(columns=RAPSODO_HITTING_COLUMNS)
+
+# One row per Rapsodo id (as text): RAPSODO_HITTING_COLUMNS
+def rapsodo_hitting_leaderboard(start_date, end_date, rapsodo_ids):
+    rapsodo_ids = [rapsodo_id_text(rapsodo_id) for rapsodo_id in rapsodo_ids if pd.notna(rapsodo_id)]
+
+    params = date_params(start_date, end_date)
+    params["rapsodo_ids"] = rapsodo_ids
+    df = run_rpc("rapsodo_hitting_leaderboard", "rapsodo_hitting", params)
+
+    if df is None:
+        return rapsodo_hitting_leaderboard_frame(start_date, end_date, rapsodo_ids)
+
+    if df.empty:
+        return pd.DataFrame(columns=RAPSODO_HITTING_COLUMNS)
+    return df.rename(columns={
+        'exit_velocity_max': 'ExitVelocity_max',
+        'exit_velocity_avg': 'ExitVelocity_avg',
+        'exit_velocity_90': 'ExitVelocity_90th_percentile',
+    })[RAPSODO_HITTING_COLUMNS]
+
+#%% Rapsodo Pitching
+
+RELEASE_COLUMNS = ['rapsodo_id', 'Release Side_mean', 'Release Height_mean']
+
+def rapsodo_release_leaderboard_frame(start_date, end_date, rapsodo_ids):
+    stats = summary_stats(fetch_summaries('rapsodo_pitching', rapsodo_ids, start_date, end_date), ['player'])
+    return stats.rename(columns={'player': 'rapsodo_id'}).reindex(columns=RELEASE_COLUMNS)
+
+# One row per Rapsodo id (as text): RELEASE_COLUMNS
+def rapsodo_release_leaderboard(start_date, end_date, rapsodo_ids):
+    rapsodo_ids = [rapsodo_id_text(rapsodo_id) for rapsodo_id in rapsodo_ids if pd.notna(rapsodo_id)]
+
+    params = date_params(start_date, end_date)
+    params["rapsodo_ids"] = rapsodo_ids
+    df = run_rpc("rapsodo_release_leaderboard", "rapsodo_pitching", params)
+
+    if df is None:
+        return rapsodo_release_leaderboard_frame(start_date, end_date, rapsodo_ids)
+
+    if df.empty:
+        return pd.DataFrame(columns=RELEASE_COLUMNS)
+    return df.rename(columns={
+        'release_side_mean': 'Release Side_mean',
+        'release_height_mean': 'Release Height_mean',
+    })[RELEASE_COLUMNS]
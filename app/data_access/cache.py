@@ -0,0 +1,164 @@
+#%% Imports
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# Cached frames are shared by every session, and pages get shallow copies of them.
+# With copy-on-write a page that edits a column (swings['created_date'] = ...) copies just that column first,
+# so a cached frame can't be changed by any page.
+pd.set_option("mode.copy_on_write", True)
+
+#%% Table Cache
+
+# Approximate memory held by a cached value
+def value_bytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_bytes(item) for item in value.values())
+    return sys.getsizeof(value)
+
+# Holds fetched tables keyed by (table_name, ...) and expires them after ttl seconds.
+# One instance is shared by the whole process; when the entries pass max_bytes the least recently used are dropped.
+class TableCache:
+    def __init__(self, ttl, max_bytes=None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # bumped by invalidate, per table and for clearing everything; see generation()
+        self.generations = {}
+        self.cleared = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value, size = entry
+
+            # Expired entries count as a miss and are dropped
+            if time.monotonic() - stored_at > self.ttl:
+                self.drop(key)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    # Read before a fetch and passed to put: a table invalidated while the fetch ran may have changed
+    # underneath it, so the result is not stored
+    def generation(self, table_name):
+        with self.lock:
+            return self.cleared, self.generations.get(table_name, 0)
+
+    def put(self, key, value, generation=None):
+        size = value_bytes(value)
+        with self.lock:
+            if generation is not None and generation != (self.cleared, self.generations.get(key[0], 0)):
+                return
+            if key in self.entries:
+                self.drop(key)
+            self.entries[key] = (time.monotonic(), value, size)
+            self.total_bytes += size
+
+            # Evict from the least recently used end, always keeping the entry just stored
+            while self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                oldest = next(iter(self.entries))
+                self.drop(oldest)
+                self.evictions += 1
+
+    # Callers hold the lock
+    def drop(self, key):
+        stored_at, value, size = self.entries.pop(key)
+        self.total_bytes -= size
+
+    # Drop every entry for a table (or everything when no table is given)
+    def invalidate(self, table_name=None):
+        with self.lock:
+            if table_name is None:
+                self.cleared += 1
+                self.entries.clear()
+                self.total_bytes = 0
+                return
+            self.generations[table_name] = self.generations.get(table_name, 0) + 1
+            for key in [k for k in self.entries if k[0] == table_name]:
+                self.drop(key)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "evictions": self.evictions,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+#%% Single Flight
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+# Collapses identical concurrent fetches: the first caller for a key runs the download, callers that
+# arrive while it is running wait for its result instead of sending the same request again.
+class SingleFlight:
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fetch):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = Flight()
+                self.flights[key] = flight
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fetch()
+            return flight.result
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "fetches": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.flights),
+            }
@@ -0,0 +1,198 @@
+#%% Imports
+
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from data_access.settings import change_poll_seconds, change_source
+
+logger = logging.getLogger(__name__)
+
+#%% Watched Tables
+
+# Tables whose changes drop their cache entries: table -> column that grows with every insert.
+# swings rows are keyed by uuid, so its newest created_at is compared instead of max(id).
+WATCHED_TABLES = {
+    "players": "id",
+    "users": "id",
+    "swings": "created_at",
+    "rapsodo_hitting": "id",
+    "rapsodo_pitching": "id",
+    "plate_discipline": "id",
+    "dk_sessions": "id",
+    "video": "id",
+    "goals": "id",
+}
+
+#%% Notifications
+
+# Callbacks run with the table name on every change, from whichever thread saw it (tables.py registers clear_table_cache)
+_listeners = []
+_events = {}
+_events_lock = threading.Lock()
+
+def on_table_change(callback):
+    _listeners.append(callback)
+
+# Report a change to a table; source says who saw it ("realtime", "poll" or "local")
+def notify_change(table_name, source):
+    with _events_lock:
+        count = _events.get(table_name, {}).get("count", 0)
+        _events[table_name] = {"source": source, "at": time.time(), "count": count + 1}
+    for callback in _listeners:
+        callback(table_name)
+
+# Last change seen per table, for debugging
+def change_events():
+    with _events_lock:
+        return {table_name: dict(event) for table_name, event in _events.items()}
+
+#%% Polling
+
+# Fallback source: every DP_CHANGE_POLL seconds read the newest id (or created_at) of each watched table.
+# A higher value means rows were added. Edits to existing rows aren't seen here, but the app's own writes
+# already clear the cache through insert_rows/update_rows.
+class PollingWatcher(threading.Thread):
+    def __init__(self, client, interval):
+        super().__init__(name="dp-change-poll", daemon=True)
+        self.client = client
+        self.interval = interval
+        self.marks = {}
+        self.skipped = set()
+
+    def newest(self, table_name, column):
+        response = (
+            self.client.table(table_name)
+            .select(column)
+            .order(column, desc=True)
+            .limit(1)
+            .execute()
+        )
+        return response.data[0][column] if response.data else None
+
+    def poll(self):
+        for table_name, column in WATCHED_TABLES.items():
+            if table_name in self.skipped:
+                continue
+            try:
+                mark = self.newest(table_name, column)
+            except Exception:
+                # e.g. a table without the column; stop asking for it
+                logger.warning("Not polling %s for changes", table_name, exc_info=True)
+                self.skipped.add(table_name)
+                continue
+
+            if table_name in self.marks and self.marks[table_name] != mark:
+                notify_change(table_name, "poll")
+            self.marks[table_name] = mark
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                logger.warning("Change poll failed", exc_info=True)
+            time.sleep(self.interval)
+
+#%% Realtime
+
+# seconds between heartbeats, and without any message (event or heartbeat reply) before the feed counts as dead
+REALTIME_HEARTBEAT_SECONDS = 15
+REALTIME_TIMEOUT_SECONDS = 45
+
+# Supabase Realtime: one channel per watched table, joined with a postgres_changes config so the server sends
+# that table's INSERT/UPDATE/DELETE events, each of which drops the table. Runs its own event loop in a
+# thread over a bare websocket (the realtime package can't send the config). If the socket can't connect,
+# a join is refused, or nothing arrives within REALTIME_TIMEOUT_SECONDS, polling takes over.
+class RealtimeWatcher(threading.Thread):
+    def __init__(self, client, interval):
+        super().__init__(name="dp-change-realtime", daemon=True)
+        self.client = client
+        self.interval = interval
+
+    def join_message(self, ref, table_name):
+        return {
+            "topic": f"realtime:dp-{table_name}",
+            "event": "phx_join",
+            "ref": str(ref),
+            "payload": {
+                "config": {
+                    "broadcast": {"self": False},
+                    "presence": {"key": ""},
+                    "postgres_changes": [{"event": "*", "schema": "public", "table": table_name}],
+                },
+                "access_token": self.client.supabase_key,
+            },
+        }
+
+    async def watch(self):
+        # imported here so the polling and local sources work without the websockets package
+        import websockets
+
+        url = f"{self.client.realtime_url}/websocket?apikey={self.client.supabase_key}&vsn=1.0.0"
+        async with websockets.connect(url) as socket:
+            topics = {}
+            for ref, table_name in enumerate(WATCHED_TABLES, start=1):
+                message = self.join_message(ref, table_name)
+                topics[message["topic"]] = table_name
+                await socket.send(json.dumps(message))
+
+            async def heartbeat():
+                ref = 0
+                while True:
+                    ref += 1
+                    await socket.send(json.dumps({"topic": "phoenix", "event": "heartbeat", "payload": {}, "ref": f"hb-{ref}"}))
+                    await asyncio.sleep(REALTIME_HEARTBEAT_SECONDS)
+
+            beating = asyncio.ensure_future(heartbeat())
+            try:
+                while True:
+                    # a silent socket (no events, no heartbeat replies) raises asyncio.TimeoutError
+                    message = json.loads(await asyncio.wait_for(socket.recv(), REALTIME_TIMEOUT_SECONDS))
+                    table_name = topics.get(message.get("topic"))
+                    if message.get("event") == "phx_reply" and message["payload"].get("status") != "ok":
+                        raise RuntimeError(f"Realtime refused {message.get('topic')}: {message['payload']}")
+                    if table_name and message.get("event") == "postgres_changes":
+                        notify_change(table_name, "realtime")
+            finally:
+                beating.cancel()
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self.watch())
+        except asyncio.TimeoutError:
+            logger.warning("Realtime change feed silent for %s seconds", REALTIME_TIMEOUT_SECONDS)
+        except Exception:
+            logger.warning("Realtime change feed failed", exc_info=True)
+        finally:
+            loop.close()
+
+        logger.warning("Realtime change feed closed; polling for changes instead")
+        PollingWatcher(self.client, self.interval).start()
+
+#%% Start
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+# Start the process-wide change source once (DP_CHANGE_SOURCE = poll, realtime or off).
+# The local backend also reports its own writes through notify_change, whatever the source.
+def start_change_watcher(client):
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None:
+            return
+        source = change_source()
+        interval = change_poll_seconds()
+        if source == "realtime" and hasattr(client, "realtime_url"):
+            _watcher = RealtimeWatcher(client, interval)
+        elif source in ("poll", "realtime"):
+            _watcher = PollingWatcher(client, interval)
+        else:
+            _watcher = False
+            return
+        _watcher.start()
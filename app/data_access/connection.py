@@ -0,0 +1,36 @@
+#%% Imports
+
+import streamlit as st
+from st_supabase_connection import SupabaseConnection
+
+from data_access.changes import start_change_watcher
+from data_access.http_pool import configure_client
+from data_access.instrumentation import TimedConnection, get_io_log
+from data_access.jobs import start_job_workers
+from data_access.local_backend import get_local_db
+from data_access.settings import backend
+
+#%% Connect to Supabase
+
+# DP_BACKEND=local swaps Supabase for the SQLite stand-in in local_backend.py (seeded data, no network).
+def get_connection():
+    if backend() == "local":
+        connection = get_local_db()
+    else:
+        # st.connection keeps one client per process; its HTTP sessions are swapped for the retrying pool once
+        connection = st.connection("supabase", type=SupabaseConnection)
+        configure_client(connection.client)
+    # polls use the bare client so their queries stay out of every session's I/O log
+    start_change_watcher(connection.client)
+    return connection
+
+# Shared connection used by every page. Either backend exposes the same surface the pages use:
+# db.client.table(...) queries, db.client.storage buckets and db.client.rpc(...).
+# Calls are timed into the current rerun's I/O log (see instrumentation.py).
+def get_db():
+    return TimedConnection(get_connection(), get_io_log())
+
+# Background job workers (jobs.py) run in the app's process only, started by devon-prep-coaches-app.py;
+# command line tools that call get_db() leave the queue alone. They get the bare client as well.
+def start_background_jobs():
+    start_job_workers(get_connection().client)
@@ -0,0 +1,135 @@
+#%% Imports
+
+import random
+import threading
+import time
+
+import httpx
+
+from data_access.settings import http_backoff, http_keepalive, http_max_connections, http_retries
+
+#%% Retries
+
+# Methods safe to send twice; PostgREST reads are GETs, inserts/updates/rpc are POST/PATCH
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Longest single wait, so a bad Retry-After can't hang a rerun
+MAX_BACKOFF = 8.0
+
+# Retries taken by the request running on this thread, read back by the I/O log (instrumentation.py)
+_retries = threading.local()
+
+def reset_retries():
+    _retries.count = 0
+
+def retries_taken():
+    return getattr(_retries, "count", 0)
+
+# Response body bytes read on this thread as they came over the wire (before decompression), for the I/O log
+_received = threading.local()
+
+def reset_received():
+    _received.count = 0
+
+def bytes_received():
+    return getattr(_received, "count", 0)
+
+class CountingStream(httpx.SyncByteStream):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __iter__(self):
+        for chunk in self.stream:
+            _received.count = bytes_received() + len(chunk)
+            yield chunk
+
+    def close(self):
+        self.stream.close()
+
+# Full jitter: a random wait up to backoff * 2^attempt, or the server's Retry-After when it sends one
+def backoff_seconds(attempt, response=None):
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+    return random.uniform(0, min(http_backoff() * 2 ** attempt, MAX_BACKOFF))
+
+# Pooled HTTP/2 transport that retries idempotent requests on 5xx/429 and dropped connections.
+# A request that never connected (ConnectError/ConnectTimeout) is retried whatever its method.
+class RetryTransport(httpx.HTTPTransport):
+    def __init__(self, retries, **kwargs):
+        super().__init__(**kwargs)
+        self.max_retries = retries
+
+    def handle_request(self, request):
+        attempt = 0
+        while True:
+            idempotent = request.method in IDEMPOTENT_METHODS
+            try:
+                response = super().handle_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= self.max_retries:
+                    raise
+                wait = backoff_seconds(attempt)
+            except httpx.TransportError:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                wait = backoff_seconds(attempt)
+            else:
+                if not idempotent or response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    response.stream = CountingStream(response.stream)
+                    return response
+                wait = backoff_seconds(attempt, response)
+                response.close()
+
+            attempt += 1
+            _retries.count = retries_taken() + 1
+            time.sleep(wait)
+
+#%% Sessions
+
+_configure_lock = threading.Lock()
+
+# A copy of a postgrest/storage session on the shared retrying pool (DP_HTTP_MAX_CONNECTIONS, DP_HTTP_KEEPALIVE, DP_HTTP_RETRIES)
+def pooled_session(session):
+    transport = RetryTransport(
+        retries=http_retries(),
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=http_max_connections(),
+            max_keepalive_connections=http_keepalive(),
+            keepalive_expiry=60.0,
+        ),
+    )
+    pooled = session.__class__(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        follow_redirects=True,
+        transport=transport,
+    )
+    pooled.dp_pooled = True
+    return pooled
+
+def is_pooled(session):
+    return getattr(session, "dp_pooled", False)
+
+# Move a Supabase client's table and storage traffic onto pooled sessions.
+# supabase-py drops its postgrest/storage clients on auth events, so this runs on every get_db() and
+# only swaps sessions that aren't pooled yet.
+def configure_client(client):
+    with _configure_lock:
+        postgrest = client.postgrest
+        if not is_pooled(postgrest.session):
+            old = postgrest.session
+            postgrest.session = pooled_session(old)
+            old.close()
+
+        storage = client.storage
+        if not is_pooled(storage.session):
+            old = storage.session
+            storage.session = pooled_session(old)
+            # bucket proxies are built from _client, the same session under another name
+            storage._client = storage.session
+            old.close()
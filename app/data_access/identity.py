@@ -0,0 +1,101 @@
+#%% Imports
+
+import pandas as pd
+
+from data_access.aggregates import rapsodo_id_text
+from data_access.tables import cached_fetch, fetch_table_data
+
+#%% Identity Index
+
+# GameChanger spellings kept on each player row
+GC_NAME_COLUMNS = [
+    'gc_name_with_number_1', 'gc_name_with_number_2', 'gc_name_with_number_3',
+    'gc_name_full_1', 'gc_name_full_2', 'gc_name_full_3',
+    'gc_name_initial_1', 'gc_name_initial_2', 'gc_name_initial_3',
+]
+
+def text_key(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return str(value).strip()
+
+# Dict lookups from player_id to names/ids and back, built from the players table
+def player_lookups(players):
+    lookups = {"full_name": {}, "rapsodo_id": {}, "by_rapsodo_id": {}, "by_gc_name": {}}
+    if players.empty:
+        return lookups
+
+    for player_id, row in players.iterrows():
+        player_id = int(player_id)
+        lookups["full_name"][player_id] = f"{row.get('first_name')} {row.get('last_name')}"
+
+        rapsodo_id = row.get('rapsodo_id')
+        if rapsodo_id is not None and pd.notna(rapsodo_id):
+            lookups["rapsodo_id"][player_id] = rapsodo_id_text(rapsodo_id)
+            lookups["by_rapsodo_id"][rapsodo_id_text(rapsodo_id)] = player_id
+
+        # a GC spelling shared by two players resolves to the first one, as the old search did
+        for column in GC_NAME_COLUMNS:
+            name = text_key(row.get(column))
+            if name:
+                lookups["by_gc_name"].setdefault(name, player_id)
+    return lookups
+
+# Emails (lower case) to user type and player, built from the users table
+def user_lookups(users):
+    lookups = {"type": {}, "player_id": {}}
+    if users.empty:
+        return lookups
+
+    for _, row in users.iterrows():
+        email = text_key(row.get('email'))
+        if not email:
+            continue
+        email = email.lower()
+        lookups["type"][email] = row.get('type')
+        player_id = row.get('player_id')
+        if player_id is not None and pd.notna(player_id):
+            lookups["player_id"][email] = int(player_id)
+    return lookups
+
+# Resolves any outside identifier (email, Rapsodo id, GameChanger name) to a player_id and back in O(1).
+# The player and user halves are cached separately under their own tables, so a change to one table
+# only rebuilds its half.
+class IdentityIndex:
+    def __init__(self, players, users):
+        self.players = players
+        self.users = users
+
+    # Users
+    def user_type(self, email):
+        return self.users["type"].get((email or "").lower())
+
+    def player_for_email(self, email):
+        return self.users["player_id"].get((email or "").lower())
+
+    # Players
+    def full_name(self, player_id):
+        return self.players["full_name"].get(int(player_id)) if player_id is not None else None
+
+    def rapsodo_id(self, player_id):
+        return self.players["rapsodo_id"].get(int(player_id)) if player_id is not None else None
+
+    def player_for_rapsodo(self, rapsodo_id):
+        if rapsodo_id is None or pd.isna(rapsodo_id):
+            return None
+        return self.players["by_rapsodo_id"].get(rapsodo_id_text(rapsodo_id))
+
+    def player_for_gc_name(self, name):
+        return self.players["by_gc_name"].get(text_key(name))
+
+    # Column versions for joins: a Series of Rapsodo ids becomes a Series of player_ids (NaN when unknown)
+    def map_rapsodo(self, rapsodo_ids):
+        return pd.to_numeric(rapsodo_ids.map(self.player_for_rapsodo), errors='coerce')
+
+    def map_full_name(self, player_ids):
+        return player_ids.map(self.full_name)
+
+def get_identity():
+    players = cached_fetch(("players", "identity"), lambda: player_lookups(fetch_table_data('players')))
+    users = cached_fetch(("users", "identity"), lambda: user_lookups(fetch_table_data('users')))
+    return IdentityIndex(players, users)
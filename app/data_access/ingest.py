@@ -0,0 +1,554 @@
+#%% Imports
+
+import csv
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+
+from data_access.connection import get_db
+from data_access.jobs import enqueue_job, register_job_handler
+from data_access.schema import CATEGORY, DATE, FLOAT, NA_SENTINELS, TABLE_SCHEMAS, pitch_type_name
+from data_access.summaries import add_summaries, rebuild_summaries, refresh_summaries, summarize
+from data_access.settings import (
+    fetch_workers,
+    ingest_batch_rows,
+    ingest_chunk_rows,
+    jobs_spool_dir,
+    upload_checkpoints_path,
+)
+from data_access.tables import clear_table_cache, download_query, drop_table_mirror, quote_column
+
+#%% File Types
+
+# Arrow types an upload is parsed with: metric columns as float64 (float32 would send 85.0999... for 85.1),
+# dates and categories as text so clean_chunk can standardize them. Other columns are read as text and
+# turned into numbers chunk by chunk (infer_numbers); pyarrow would fix their type from the first block
+# alone and reject a file whose later rows don't fit it.
+UPLOAD_TYPES = {FLOAT: pa.float64(), DATE: pa.string(), CATEGORY: pa.string()}
+
+def column_types(table_name):
+    return {column: UPLOAD_TYPES[kind] for column, kind in TABLE_SCHEMAS.get(table_name, {}).items()}
+
+# Diamond Kinetics exports: three header rows above the swings, 15 leading columns we don't keep,
+# and swing.sensorDateTime dropped from the rest; what remains is renamed by position
+DK_COLUMNS = [
+    "uuid","created_date","created_datetime","swing_power","max_acceleration",
+    "impact_momentum","max_hand_speed","max_barrel_speed","speed_efficiency",
+    "trigger_to_impact","attack_angle","hand_cast","distance_in_zone",
+    "sensor_time_sec","vertical_angle","barrel_x","barrel_y","barrel_z",
+    "exit_velocity","potential_distance","player_id","bat_length"
+]
+
+# Rapsodo pitches are stored with their app pitch type name (pitch_type) and whether they were thrown at
+# high intent (high_intent), worked out once here rather than on every page view (sql/pitch_types.sql)
+def normalize_pitching(chunk):
+    if "Pitch Type" in chunk.columns:
+        chunk["pitch_type"] = chunk["Pitch Type"].map(pitch_type_name)
+    if "Intent Type" in chunk.columns:
+        chunk["high_intent"] = (chunk["Intent Type"] == "high_intent").where(chunk["Intent Type"].notna())
+    return chunk
+
+# Vendor export formats: destination table, the column that identifies a row, the label shown on the page,
+# the header columns that identify the format, how the file's columns map to table columns, the types they
+# are parsed with and the values that mean "missing".
+#   skip_rows: rows between the header and the data; skip_columns/drop: source columns left out;
+#   columns: table names for the kept columns, by position (None keeps the file's own names)
+#   normalize: adds derived columns to every parsed chunk
+FILE_TYPES = {
+    "rapsodo_pitching": {
+        "table": "rapsodo_pitching", "key": "Pitch ID", "label": "Rapsodo Pitching",
+        "signature": ["Pitch ID"], "columns": None,
+        "types": column_types("rapsodo_pitching"), "na_values": [""] + NA_SENTINELS,
+        "normalize": normalize_pitching,
+    },
+    "rapsodo_hitting": {
+        "table": "rapsodo_hitting", "key": "HitID", "label": "Rapsodo Hitting",
+        "signature": ["HitID"], "columns": None,
+        "types": column_types("rapsodo_hitting"), "na_values": [""] + NA_SENTINELS,
+    },
+    "dk_hitting": {
+        "table": "swings", "key": "uuid", "label": "Diamond Kinetics Hitting",
+        "signature": ["user.battingOrientation"], "columns": DK_COLUMNS,
+        "skip_rows": 3, "skip_columns": 15, "drop": ["swing.sensorDateTime"],
+        "types": column_types("swings"), "na_values": [""] + NA_SENTINELS,
+    },
+}
+
+# Only the start of a file is read to find its format
+SNIFF_BYTES = 16 * 1024
+
+# Header row and a text sample from the start of the file; the file is left at the start
+def sniff(file):
+    file.seek(0)
+    sample = file.read(SNIFF_BYTES)
+    file.seek(0)
+    if isinstance(sample, bytes):
+        sample = sample.decode("utf-8-sig", errors="replace")
+    header = next(csv.reader(sample.splitlines()[:1]), [])
+    return header, sample
+
+def read_header(file):
+    return sniff(file)[0]
+
+# Determine file type from the header row
+def detect_file_type(columns):
+    for file_type, spec in FILE_TYPES.items():
+        if all(column in columns for column in spec["signature"]):
+            return file_type
+    return None
+
+# File column -> table column for the columns kept from an upload
+def column_mapping(file_type, header):
+    spec = FILE_TYPES[file_type]
+    kept = [column for column in header[spec.get("skip_columns", 0):] if column not in spec.get("drop", [])]
+    if spec["columns"] is None:
+        return {column: column for column in kept}
+    if len(kept) != len(spec["columns"]):
+        raise ValueError(f"{spec['label']} file has {len(kept)} data columns, expected {len(spec['columns'])}")
+    return dict(zip(kept, spec["columns"]))
+
+#%% Chunked Reading
+
+# The file is parsed by pyarrow's streaming CSV reader in blocks of roughly DP_INGEST_CHUNK_ROWS rows, so memory
+# stays flat however long the export is. Columns are typed while parsing; a row with the wrong number of
+# fields or text in a metric column raises pyarrow.ArrowInvalid at the block it's in.
+def read_chunks(file, file_type, chunk_rows=None):
+    spec = FILE_TYPES[file_type]
+    header, sample = sniff(file)
+    mapping = column_mapping(file_type, header)
+
+    row_bytes = len(sample.encode()) / max(sample.count("\n"), 1)
+    block_size = max(int(row_bytes * (chunk_rows or ingest_chunk_rows())), 64 * 1024)
+    types = {source: spec["types"].get(column, pa.string()) for source, column in mapping.items()}
+    inferred = [column for column in mapping.values() if column not in spec["types"]]
+
+    reader = pa_csv.open_csv(
+        file,
+        read_options=pa_csv.ReadOptions(block_size=block_size, skip_rows_after_names=spec.get("skip_rows", 0)),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=types,
+            null_values=spec["na_values"],
+            strings_can_be_null=True,
+            include_columns=list(mapping),
+        ),
+    )
+    for batch in reader:
+        chunk = batch.to_pandas(date_as_object=False).rename(columns=mapping)
+        yield clean_chunk(infer_numbers(chunk, inferred), file_type)
+
+# Columns of a chunk whose values are all numbers become numbers, as read_csv inferred them; whole numbers
+# as nullable integers, so ids with gaps aren't sent as floats
+def infer_numbers(chunk, columns):
+    for column in columns:
+        values = chunk[column]
+        numbers = pd.to_numeric(values, errors="coerce")
+        if numbers.notna().sum() != values.notna().sum() or values.isna().all():
+            continue
+        whole = numbers.dropna()
+        if (whole == whole.round()).all() and whole.abs().max() < 2 ** 53:
+            numbers = numbers.astype(pd.Int64Dtype())
+        chunk[column] = numbers
+    return chunk
+
+def clean_chunk(chunk, file_type):
+    # Standardize Date column if it exists
+    if "Date" in chunk.columns:
+        chunk['Date'] = pd.to_datetime(chunk['Date']).dt.strftime('%Y-%m-%d')
+
+    normalize = FILE_TYPES[file_type].get("normalize")
+    return normalize(chunk) if normalize else chunk
+
+# Plain Python values with None for missing ones, ready to send as JSON; dates and times pyarrow
+# recognized go out as ISO text
+def as_records(chunk):
+    for column in chunk.select_dtypes(include=["datetime", "datetimetz"]).columns:
+        chunk[column] = chunk[column].map(lambda value: value.isoformat() if pd.notna(value) else None)
+    return chunk.astype(object).where(chunk.notna(), None).to_dict(orient="records")
+
+#%% Upload
+
+# Tables found without a unique index on their key (sql/unique_keys.sql not loaded); these check keys first
+_no_conflict_target = set()
+
+# Insert the rows of a batch whose key isn't stored yet and return the keys (as text) that went in.
+# The database skips known keys itself (insert-or-ignore upsert on the key's unique index); without the
+# index, only this batch's keys are looked up, so the cost never depends on the size of the table.
+def insert_new_rows(client, table_name, key_column, batch):
+    if table_name not in _no_conflict_target:
+        try:
+            response = (
+                client.table(table_name)
+                .upsert(batch, on_conflict=quote_column(key_column), ignore_duplicates=True)
+                .execute()
+            )
+            return {str(row[key_column]) for row in response.data or []}
+        except APIError as error:
+            # 42P10: no unique or exclusion constraint matching the ON CONFLICT columns
+            if error.code != "42P10":
+                raise
+            _no_conflict_target.add(table_name)
+
+    keys = [row[key_column] for row in batch]
+    stored = (
+        client.table(table_name)
+        .select(quote_column(key_column))
+        .in_(quote_column(key_column), keys)
+        .execute()
+    )
+    stored_keys = {str(row[key_column]) for row in stored.data or []}
+    new = [row for row in batch if str(row[key_column]) not in stored_keys]
+    if new:
+        client.table(table_name).insert(new).execute()
+    return {str(row[key_column]) for row in new}
+
+# Summary rows (summaries.py) for the rows of a batch that went in
+def summarize_inserted(table_name, key_column, batch, inserted):
+    stored = [row for row in batch if str(row[key_column]) in inserted]
+    return summarize(table_name, pd.DataFrame(stored)) if stored else None
+
+#%% Checkpoints
+#
+# A local SQLite file (DP_UPLOAD_CHECKPOINTS) with two tables:
+#   uploaded_files: content hash of every file whose upload finished, so sending the same file again is
+#     recognized by one lookup instead of reading it or the table
+#   upload_runs: for an unfinished set of files (keyed by their hashes and the batch size, which fix the
+#     numbered batches), how many batches were committed and the per-file counts so far
+# A failed upload run again with the same files resumes after its last committed batch. The run is recorded
+# before its first batch, so a resume knows the next batch may have been stored without being checkpointed.
+
+def connect_checkpoints():
+    path = upload_checkpoints_path()
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS uploaded_files (
+            hash TEXT PRIMARY KEY, name TEXT, file_type TEXT, inserted INTEGER, uploaded_at REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS upload_runs (
+            run TEXT PRIMARY KEY, batches_done INTEGER NOT NULL, results TEXT NOT NULL, updated_at REAL
+        )
+    """)
+    return conn
+
+# sha256 of the file's bytes, read 1 MB at a time; the file is left at the start
+def file_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(1024 * 1024), b""):
+        digest.update(block if isinstance(block, bytes) else block.encode())
+    file.seek(0)
+    return digest.hexdigest()
+
+def uploaded_file(content_hash):
+    with closing(connect_checkpoints()) as conn:
+        row = conn.execute("SELECT uploaded_at FROM uploaded_files WHERE hash = ?", (content_hash,)).fetchone()
+    return row is not None
+
+def load_checkpoint(run):
+    with closing(connect_checkpoints()) as conn:
+        row = conn.execute("SELECT batches_done, results FROM upload_runs WHERE run = ?", (run,)).fetchone()
+    return (row[0], json.loads(row[1])) if row else (0, None)
+
+def save_checkpoint(run, batches_done, results):
+    with closing(connect_checkpoints()) as conn:
+        conn.execute(
+            "INSERT INTO upload_runs (run, batches_done, results, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (run) DO UPDATE SET batches_done = excluded.batches_done, "
+            "results = excluded.results, updated_at = excluded.updated_at",
+            (run, batches_done, json.dumps(results), time.time()),
+        )
+
+# Every batch is in: remember the files and drop the run's checkpoint
+def finish_checkpoint(run, uploads, results):
+    with closing(connect_checkpoints()) as conn:
+        conn.execute("BEGIN")
+        for upload, result in zip(uploads, results):
+            if upload["file_type"] is not None and not upload["repeat"] and result["error"] is None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO uploaded_files (hash, name, file_type, inserted, uploaded_at) VALUES (?, ?, ?, ?, ?)",
+                    (upload["hash"], upload["name"], upload["file_type"], result["inserted"], time.time()),
+                )
+        conn.execute("DELETE FROM upload_runs WHERE run = ?", (run,))
+        conn.execute("COMMIT")
+
+#%% Multiple Files
+
+# Check one uploaded file: its content hash, format and columns. Problems are reported on the file's result
+# instead of raised. A file whose content was uploaded before is left out (repeat=True) unless force is set.
+def parse_upload(file, force=False):
+    result = {"name": file.name, "file": file, "file_type": None, "error": None, "hash": None, "repeat": False}
+    try:
+        result["hash"] = file_hash(file)
+        header = read_header(file)
+        file_type = detect_file_type(header)
+        if file_type is None:
+            result["error"] = "Unrecognized file type"
+            return result
+        column_mapping(file_type, header)
+        result["file_type"] = file_type
+        if not force and uploaded_file(result["hash"]):
+            result["repeat"] = True
+    except Exception as error:
+        result["error"] = f"Could not read file: {error}"
+    return result
+
+# Size in bytes, for progress; the file is left at the start
+def file_size(file):
+    size = file.seek(0, os.SEEK_END)
+    file.seek(0)
+    return size
+
+# Parsed chunks a file may have waiting in its queue; parsing runs this far ahead of the inserts
+READ_AHEAD_CHUNKS = 2
+_END_OF_FILE = object()
+
+# Parse one file on a pool worker into its bounded queue, ending with _END_OF_FILE, or the parse error in
+# its place. Gives up once stop is set (the upload failed and nothing reads the queue any more).
+def parse_into_queue(upload, chunks, stop):
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for chunk in read_chunks(upload["file"], upload["file_type"]):
+            if not put(chunk):
+                return
+    except Exception as error:
+        put(error)
+        return
+    put(_END_OF_FILE)
+
+def queued_chunks(chunks):
+    while True:
+        item = chunks.get()
+        if item is _END_OF_FILE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+# The rows of one file to send, DP_INGEST_BATCH_ROWS at a time, from its parsed chunks, so only a few chunks
+# and a batch are held at once. Rows without a key, or whose key was already seen in this upload (this file
+# or an earlier one for the same table), are counted on the file's result and left out. Batches don't depend
+# on the chunk size, so the same file always gives the same batches.
+def file_batches(chunks, key_column, result, seen, batch_rows):
+    pending = []
+    for chunk in chunks:
+        chunk = chunk[chunk[key_column].notna()]
+        result["read"] += len(chunk)
+
+        keys = chunk[key_column].astype(str)
+        repeated = keys.isin(seen) | keys.duplicated()
+        result["duplicates"] += int(repeated.sum())
+        seen.update(keys)
+
+        pending.extend(as_records(chunk[~repeated]))
+        while len(pending) >= batch_rows:
+            yield pending[:batch_rows]
+            del pending[:batch_rows]
+    if pending:
+        yield pending
+
+# Upload several exports together: files are hashed, checked and parsed in parallel (DP_FETCH_WORKERS threads,
+# each file into a bounded queue of chunks), while this thread takes the files' chunks in upload order, drops
+# keys repeated within or across files and sends numbered batches of DP_INGEST_BATCH_ROWS, checkpointed after
+# each one (see Checkpoints). The daily summaries of each batch's new rows
+# are added before its checkpoint (a failed summary write fails the upload, and the retry redoes that batch's
+# summaries), and each table's cache is cleared once at the end. Returns one result per file, in upload order, with
+# read/duplicates/inserted/skipped counts, repeat=True for a file uploaded before (skipped unless force),
+# or an error; a file that fails to parse part way keeps the rows sent before the bad block.
+# progress(fraction, results) is called after every batch.
+def ingest_files(files, progress=None, batch_rows=None, client=None, force=False):
+    batch_rows = batch_rows or ingest_batch_rows()
+    if not files:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(fetch_workers(), len(files))) as pool:
+        parsed = list(pool.map(lambda file: parse_upload(file, force), files))
+
+    results = []
+    for upload in parsed:
+        spec = FILE_TYPES.get(upload["file_type"], {})
+        results.append({
+            "name": upload["name"], "label": spec.get("label"), "table": spec.get("table"),
+            "read": 0, "duplicates": 0, "inserted": 0, "skipped": 0,
+            "repeat": upload["repeat"], "error": upload["error"],
+        })
+    uploads = [
+        (upload, result) for upload, result in zip(parsed, results)
+        if upload["file_type"] is not None and not upload["repeat"] and upload["error"] is None
+    ]
+
+    # the same files and batch size give the same numbered batches, so a checkpoint says where to resume;
+    # read and duplicate counts are worked out again as the files are re-read, the rest comes from the checkpoint
+    run = hashlib.sha256("|".join([upload["hash"] or "" for upload in parsed] + [str(batch_rows)]).encode()).hexdigest()
+    batches_done, saved_results = load_checkpoint(run)
+    for result, saved in zip(results, saved_results or []):
+        result.update(inserted=saved["inserted"], skipped=saved["skipped"])
+    resumed = saved_results is not None
+    if uploads and not resumed:
+        save_checkpoint(run, 0, results)
+
+    client = client or get_db().client
+    sizes = [file_size(upload["file"]) for upload, _ in uploads]
+    total_bytes = sum(sizes) or 1
+    read_bytes = 0
+    number = 0
+    seen = {}
+    written = set()
+
+    # files are parsed in upload order as pool workers free up; each one reads ahead at most READ_AHEAD_CHUNKS
+    queues = [queue.Queue(maxsize=READ_AHEAD_CHUNKS) for _ in uploads]
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(min(fetch_workers(), len(uploads)), 1))
+    for (upload, _), chunks in zip(uploads, queues):
+        pool.submit(parse_into_queue, upload, chunks, stop)
+    try:
+        for (upload, result), chunks, size in zip(uploads, queues, sizes):
+            spec = FILE_TYPES[upload["file_type"]]
+            batches = file_batches(queued_chunks(chunks), spec["key"], result, seen.setdefault(spec["table"], set()), batch_rows)
+            while True:
+                try:
+                    batch = next(batches, None)
+                except Exception as error:
+                    result["error"] = f"Could not read file: {error}"
+                    break
+                if batch is None:
+                    break
+
+                number += 1
+                if number > batches_done:
+                    inserted = insert_new_rows(client, spec["table"], spec["key"], batch)
+                    if inserted:
+                        written.add(spec["table"])
+                    if resumed and number == batches_done + 1:
+                        # the batch the last attempt stopped at may have gone in without being checkpointed
+                        written.add(spec["table"])
+                        refresh_summaries(client, spec["table"], pd.DataFrame(batch))
+                    elif inserted:
+                        add_summaries(client, summarize_inserted(spec["table"], spec["key"], batch, inserted))
+                    result["inserted"] += len(inserted)
+                    result["skipped"] += len(batch) - len(inserted)
+                    save_checkpoint(run, number, results)
+
+                if progress is not None:
+                    progress(min((read_bytes + upload["file"].tell()) / total_bytes, 1.0), results)
+            read_bytes += size
+    finally:
+        stop.set()
+        pool.shutdown(wait=True)
+        for table_name in written:
+            clear_table_cache(table_name)
+
+    if uploads:
+        finish_checkpoint(run, parsed, results)
+    if progress is not None:
+        progress(1.0, results)
+    return results
+
+#%% Background Uploads
+
+# Uploads run as "upload" jobs (jobs.py), so the page returns at once and the insert finishes even if the
+# tab is closed. The files are copied into DP_JOBS_SPOOL/<folder> first and removed once the job is done;
+# a failed job keeps them so it can be retried, and the retry resumes from its checkpoint. Rows already stored
+# are skipped, so a job interrupted by a restart is simply run again. force uploads files sent before as well.
+def enqueue_upload(files, user=None, force=False):
+    folder = os.path.join(jobs_spool_dir(), uuid.uuid4().hex)
+    os.makedirs(folder, exist_ok=True)
+    spooled = []
+    for position, file in enumerate(files):
+        path = os.path.join(folder, str(position))
+        file.seek(0)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(file, target)
+        spooled.append({"name": file.name, "path": path})
+    return enqueue_job("upload", {"folder": folder, "files": spooled, "force": force}, user=user)
+
+# A spooled copy that reports the name it was uploaded under
+def open_spooled(upload):
+    raw = io.FileIO(upload["path"], "rb")
+    raw.name = upload["name"]
+    return io.BufferedReader(raw)
+
+def run_upload_job(job, client, report):
+    payload = job["payload"]
+    files = [open_spooled(upload) for upload in payload["files"]]
+    try:
+        results = ingest_files(files, progress=report, client=client, force=payload.get("force", False))
+    finally:
+        for file in files:
+            file.close()
+    shutil.rmtree(payload["folder"], ignore_errors=True)
+    return results
+
+register_job_handler("upload", run_upload_job)
+
+#%% Backfill
+
+# Measurement columns of rapsodo_pitching, where uploads before the typed parser stored "-" for missing
+PITCHING_MEASUREMENTS = [column for column, kind in TABLE_SCHEMAS["rapsodo_pitching"].items() if kind == FLOAT]
+
+# One-time fill of pitch_type/high_intent for pitches uploaded before those columns existed, with "-" in the
+# measurement columns set to NULL. Each change is a single UPDATE run by the database, one per distinct pitch
+# type, so only the Pitch Type column is downloaded. The pitching summaries are rebuilt afterwards. The local
+# mirror (mirror.py) only pulls new rows, so it is dropped here; an app using a different DP_MIRROR_PATH has to
+# call resync_table_mirror("rapsodo_pitching") (or delete its mirror file) to see the updated rows.
+def backfill_pitching(client=None):
+    client = client or get_db().client
+    pitch_types = download_query("rapsodo_pitching", columns=["Pitch Type"], client=client)
+
+    def update(values):
+        return client.table("rapsodo_pitching").update(values, returning=ReturnMethod.minimal)
+
+    for raw_type in pitch_types["Pitch Type"].dropna().unique():
+        name = pitch_type_name(raw_type)
+        if name is not None:
+            update({"pitch_type": name}).eq(quote_column("Pitch Type"), raw_type).execute()
+
+    update({"high_intent": True}).eq(quote_column("Intent Type"), "high_intent").execute()
+    update({"high_intent": False}).neq(quote_column("Intent Type"), "high_intent").execute()
+
+    for column in PITCHING_MEASUREMENTS:
+        try:
+            update({column: None}).eq(quote_column(column), "-").execute()
+        except APIError as error:
+            # 22P02: a numeric column, which can't hold "-" in the first place
+            if error.code != "22P02":
+                raise
+
+    drop_table_mirror("rapsodo_pitching")
+    return rebuild_summaries("rapsodo_pitching", client)
+
+#%% Command Line
+
+# cd app && python -m data_access.ingest backfill
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        print("usage: python -m data_access.ingest backfill")
+        sys.exit(1)
+    print(f"rapsodo_pitching: backfilled, {backfill_pitching()} summary rows rebuilt")
@@ -0,0 +1,275 @@
+#%% Imports
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+import streamlit as st
+
+from data_access.changes import change_events
+from data_access.http_pool import bytes_received, reset_received, reset_retries, retries_taken
+from data_access.settings import io_log_backups, io_log_max_bytes, io_log_path
+
+#%% Call Records
+
+# Every table, rpc and storage call made through get_db() during one script rerun.
+# Download windows run in worker threads, so appends are guarded by a lock.
+class IOLog:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def record(self, kind, target, operation, seconds, rows=None, payload_bytes=None, retries=0, error=None):
+        with self.lock:
+            self.calls.append({
+                "kind": kind,
+                "target": target,
+                "operation": operation,
+                "seconds": round(seconds, 4),
+                "rows": rows,
+                "bytes": payload_bytes,
+                "retries": retries,
+                "error": error,
+            })
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def summary(self):
+        with self.lock:
+            calls = list(self.calls)
+        return {
+            "calls": len(calls),
+            "io_seconds": round(sum(call["seconds"] for call in calls), 4),
+            "rows": sum(call["rows"] or 0 for call in calls),
+            "bytes": sum(call["bytes"] or 0 for call in calls),
+            "retries": sum(call["retries"] for call in calls),
+            "rerun_seconds": round(self.elapsed(), 4),
+        }
+
+# Bytes the call read over the wire, counted by the pooled transport (http_pool.py); None without HTTP
+# (local backend)
+def received_size():
+    return bytes_received() or None
+
+def row_count(data):
+    if isinstance(data, list):
+        return len(data)
+    # CSV body: lines after the header
+    if isinstance(data, str):
+        return max(len(data.splitlines()) - 1, 0)
+    return None
+
+#%% Client Wrappers
+
+# Query builders return new builders from select/eq/range/...; each one is wrapped again so
+# the final .execute() is timed, labelled with the action (select/insert/update/upsert/delete/rpc).
+ACTIONS = ("select", "insert", "update", "upsert", "delete")
+
+class TimedQuery:
+    def __init__(self, builder, log, target, operation):
+        self._builder = builder
+        self._log = log
+        self._target = target
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._builder, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            if hasattr(result, "execute"):
+                operation = name if name in ACTIONS else self._operation
+                return TimedQuery(result, self._log, self._target, operation)
+            return result
+        return call
+
+    def execute(self):
+        reset_retries()
+        reset_received()
+        started = time.perf_counter()
+        try:
+            response = self._builder.execute()
+        except Exception as error:
+            self._log.record(
+                "table", self._target, self._operation, time.perf_counter() - started,
+                retries=retries_taken(), error=str(error),
+            )
+            raise
+        seconds = time.perf_counter() - started
+        data = response.data
+        self._log.record(
+            "table", self._target, self._operation, seconds, row_count(data), received_size(), retries_taken()
+        )
+        return response
+
+class TimedBucket:
+    def __init__(self, bucket, log, name):
+        self._bucket = bucket
+        self._log = log
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(self._bucket, name)
+
+    def timed(self, operation, call, sent=None):
+        reset_retries()
+        reset_received()
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception as error:
+            self._log.record(
+                "storage", self._name, operation, time.perf_counter() - started,
+                retries=retries_taken(), error=str(error),
+            )
+            raise
+        seconds = time.perf_counter() - started
+        rows = row_count(result)
+        size = sent if sent is not None else received_size()
+        self._log.record("storage", self._name, operation, seconds, rows, size, retries_taken())
+        return result
+
+    def list(self, *args, **kwargs):
+        return self.timed("list", lambda: self._bucket.list(*args, **kwargs))
+
+    def upload(self, path, file, *args, **kwargs):
+        sent = len(file) if isinstance(file, (bytes, bytearray)) else None
+        return self.timed("upload", lambda: self._bucket.upload(path, file, *args, **kwargs), sent)
+
+    def get_public_url(self, *args, **kwargs):
+        return self.timed("get_public_url", lambda: self._bucket.get_public_url(*args, **kwargs), 0)
+
+class TimedStorage:
+    def __init__(self, storage, log):
+        self._storage = storage
+        self._log = log
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+    def from_(self, bucket):
+        return TimedBucket(self._storage.from_(bucket), self._log, bucket)
+
+class TimedClient:
+    def __init__(self, client, log):
+        self._client = client
+        self._log = log
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def table(self, table_name):
+        return TimedQuery(self._client.table(table_name), self._log, table_name, "select")
+
+    def from_(self, table_name):
+        return self.table(table_name)
+
+    def rpc(self, function_name, params=None, *args, **kwargs):
+        builder = self._client.rpc(function_name, params or {}, *args, **kwargs)
+        return TimedQuery(builder, self._log, function_name, "rpc")
+
+    @property
+    def storage(self):
+        return TimedStorage(self._client.storage, self._log)
+
+# Same surface as the connection it wraps: pages keep using db.client
+class TimedConnection:
+    def __init__(self, connection, log):
+        self._connection = connection
+        self._log = log
+        self.client = TimedClient(connection.client, log)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def table(self, table_name):
+        return self.client.table(table_name)
+
+#%% Session Log
+
+# The log for the current rerun. The main script calls start_io_log() at the top of every rerun.
+def get_io_log():
+    if "io_log" not in st.session_state:
+        st.session_state["io_log"] = IOLog()
+    return st.session_state["io_log"]
+
+def start_io_log():
+    st.session_state["io_log"] = IOLog()
+    return st.session_state["io_log"]
+
+_file_logger = None
+_file_logger_lock = threading.Lock()
+
+# JSON lines, rotated by size (DP_IO_LOG_PATH, DP_IO_LOG_MAX_BYTES, DP_IO_LOG_BACKUPS)
+def get_file_logger():
+    global _file_logger
+    with _file_logger_lock:
+        if _file_logger is None:
+            path = io_log_path()
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=io_log_max_bytes(), backupCount=io_log_backups())
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _file_logger = logging.getLogger("data_access.io")
+            _file_logger.setLevel(logging.INFO)
+            _file_logger.propagate = False
+            _file_logger.addHandler(handler)
+    return _file_logger
+
+# Append the rerun's calls to the JSON log
+def write_io_log(page=None, user=None):
+    log = get_io_log()
+    with log.lock:
+        calls = list(log.calls)
+    if not calls:
+        return
+    entry = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "page": page,
+        "user": user,
+        **log.summary(),
+        "detail": calls,
+    }
+    get_file_logger().info(json.dumps(entry, default=str))
+
+#%% Debug Panel
+
+# Sidebar breakdown for admins. Time not spent in I/O went to pandas, plotting and rendering.
+def io_debug_panel():
+    log = get_io_log()
+    summary = log.summary()
+    with log.lock:
+        calls = list(log.calls)
+
+    with st.sidebar.expander("I/O debug", expanded=False):
+        other_seconds = max(summary["rerun_seconds"] - summary["io_seconds"], 0)
+        st.write(
+            f"**{summary['calls']}** calls · **{summary['io_seconds']:.2f}s** I/O · "
+            f"**{other_seconds:.2f}s** other · **{summary['rerun_seconds']:.2f}s** rerun"
+        )
+        st.caption(
+            "I/O seconds add up time across parallel downloads, so they can exceed the rerun time."
+        )
+        if calls:
+            st.dataframe(calls, hide_index=True)
+
+        events = change_events()
+        if events:
+            st.caption("Last change seen per table")
+            st.dataframe(
+                [
+                    {"table": table_name, "source": event["source"], "count": event["count"],
+                     "at": datetime.fromtimestamp(event["at"]).strftime("%H:%M:%S")}
+                    for table_name, event in events.items()
+                ],
+                hide_index=True,
+            )
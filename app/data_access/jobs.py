@@ -0,0 +1,233 @@
+#%% Imports
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from data_access.settings import job_workers, jobs_db_path
+
+logger = logging.getLogger(__name__)
+
+#%% Job Store
+#
+# A persistent queue in a local SQLite file. Pages enqueue work and return straight away; worker threads
+# in the app's process claim jobs one at a time, run the handler registered for the job's kind and record
+# progress, the result or the error. Jobs outlive the browser session that queued them. A running job is
+# stamped with its process (owner) and a heartbeat the process refreshes; one whose heartbeat has gone
+# stale, because its process stopped, is queued again (handlers must be safe to repeat).
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# seconds an idle worker waits before looking for work queued by another process
+IDLE_SECONDS = 5
+
+# seconds between heartbeats of a process's running jobs, and without one before a job counts as abandoned
+HEARTBEAT_SECONDS = 10
+STALE_SECONDS = 60
+
+# identifies this process's claims on running jobs
+OWNER = f"{os.uname().nodename}:{os.getpid()}:{time.time():.0f}"
+
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+def connect():
+    path = jobs_db_path()
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    with _schema_lock:
+        if path not in _schema_ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_by TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    owner TEXT,
+                    heartbeat REAL
+                )
+            """)
+            # job stores created before owners and heartbeats were kept
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+            _schema_ready.add(path)
+    return conn
+
+def job_record(row):
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+# Add a job and wake an idle worker; returns the job id
+def enqueue_job(kind, payload, user=None):
+    with closing(connect()) as conn:
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, status, payload, created_by, created_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, QUEUED, json.dumps(payload), user, time.time()),
+        )
+    _wake.set()
+    return cursor.lastrowid
+
+# Take the oldest queued job for this process, or None; the update is atomic, so two workers never claim
+# the same job
+def claim_job():
+    now = time.time()
+    with closing(connect()) as conn:
+        row = conn.execute(
+            """
+            UPDATE jobs SET status = ?, started_at = ?, finished_at = NULL, error = NULL, attempts = attempts + 1,
+                owner = ?, heartbeat = ?
+            WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT 1)
+            RETURNING *
+            """,
+            (RUNNING, now, OWNER, now, QUEUED),
+        ).fetchone()
+    return job_record(row) if row else None
+
+# Mark this process's running jobs as alive
+def beat():
+    with closing(connect()) as conn:
+        conn.execute("UPDATE jobs SET heartbeat = ? WHERE status = ? AND owner = ?", (time.time(), RUNNING, OWNER))
+
+# Queue again the running jobs whose process stopped (no heartbeat for STALE_SECONDS); returns how many
+def requeue_abandoned():
+    with closing(connect()) as conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, owner = NULL WHERE status = ? AND COALESCE(heartbeat, started_at, 0) < ?",
+            (QUEUED, RUNNING, time.time() - STALE_SECONDS),
+        )
+    if cursor.rowcount:
+        _wake.set()
+    return cursor.rowcount
+
+def update_job(job_id, **fields):
+    if "result" in fields:
+        fields["result"] = json.dumps(fields["result"])
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with closing(connect()) as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+def get_job(job_id):
+    with closing(connect()) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return job_record(row) if row else None
+
+# Newest jobs first, optionally of one kind
+def list_jobs(kind=None, limit=50):
+    query = "SELECT * FROM jobs"
+    params = []
+    if kind is not None:
+        query += " WHERE kind = ?"
+        params.append(kind)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    with closing(connect()) as conn:
+        return [job_record(row) for row in conn.execute(query, params)]
+
+# Queue a failed job again
+def retry_job(job_id):
+    with closing(connect()) as conn:
+        conn.execute("UPDATE jobs SET status = ?, progress = 0 WHERE id = ? AND status = ?", (QUEUED, job_id, FAILED))
+    _wake.set()
+
+#%% Handlers
+
+# kind -> handler(job, client, report); report(progress, result) records how far the job got.
+# The handler's return value is stored as the job's result (ingest.py registers "upload").
+_handlers = {}
+
+def register_job_handler(kind, handler):
+    _handlers[kind] = handler
+
+#%% Workers
+
+_wake = threading.Event()
+
+class JobWorker(threading.Thread):
+    def __init__(self, client, number):
+        super().__init__(name=f"dp-job-worker-{number}", daemon=True)
+        self.client = client
+
+    def run_job(self, job):
+        handler = _handlers.get(job["kind"])
+        if handler is None:
+            update_job(job["id"], status=FAILED, finished_at=time.time(), error=f"No handler for {job['kind']} jobs")
+            return
+
+        def report(progress, result=None):
+            fields = {"progress": progress}
+            if result is not None:
+                fields["result"] = result
+            update_job(job["id"], **fields)
+
+        try:
+            result = handler(job, self.client, report)
+        except Exception as error:
+            logger.warning("Job %s failed", job["id"], exc_info=True)
+            update_job(job["id"], status=FAILED, finished_at=time.time(), error=str(error) or type(error).__name__)
+            return
+        update_job(job["id"], status=DONE, finished_at=time.time(), progress=1.0, result=result)
+
+    def run(self):
+        while True:
+            try:
+                job = claim_job()
+            except Exception:
+                logger.warning("Could not read the job queue", exc_info=True)
+                job = None
+
+            if job is None:
+                _wake.wait(IDLE_SECONDS)
+                _wake.clear()
+                continue
+            self.run_job(job)
+
+# Keeps this process's running jobs alive and picks up the ones another process abandoned
+class Heartbeat(threading.Thread):
+    def __init__(self):
+        super().__init__(name="dp-job-heartbeat", daemon=True)
+
+    def run(self):
+        while True:
+            try:
+                beat()
+                requeue_abandoned()
+            except Exception:
+                logger.warning("Could not update the job queue", exc_info=True)
+            time.sleep(HEARTBEAT_SECONDS)
+
+_workers = []
+_workers_lock = threading.Lock()
+
+# Start the process-wide workers once (DP_JOB_WORKERS threads) and the heartbeat, with the bare client so
+# job queries stay out of every session's I/O log. Jobs still running in another live process are left alone.
+def start_job_workers(client):
+    with _workers_lock:
+        if _workers:
+            return
+        heartbeat = Heartbeat()
+        heartbeat.start()
+        _workers.append(heartbeat)
+        for number in range(job_workers()):
+            worker = JobWorker(client, number)
+            worker.start()
+            _workers.append(worker)
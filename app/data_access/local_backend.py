@@ -0,0 +1,438 @@
+#%% Imports
+
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from data_access.changes import notify_change
+from data_access.settings import local_db_path, local_storage_dir
+
+#%% Local Backend
+#
+# A stand-in for the Supabase client backed by a SQLite file and a folder of storage buckets.
+# It covers the calls the app makes through db.client:
+#   client.table(name).select(...)/.insert(...)/.update(...)/.upsert(...)/.delete()
+#     with .eq/.neq/.gt/.gte/.lt/.lte/.in_ filters, .order, .range, .limit, .csv and .execute()
+#   client.storage.from_(bucket).list()/.upload()/.get_public_url()
+#   client.rpc(...) (always reported missing, so callers use their pandas fallback)
+# Every write is reported through changes.notify_change, so cache invalidation can be tested offline.
+# Tables are created on first insert, with column types taken from the first rows written.
+# Seed one from a CSV with:  cd app && python -m data_access.local_backend seed players players.csv
+
+_write_lock = threading.Lock()
+
+def connect(path):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+# Column lists arrive in PostgREST form, e.g. 'player_id,"Pitch Type"'
+def parse_columns(columns):
+    names = [name.strip() for name in re.findall(r'"[^"]*"|[^,]+', columns)]
+    names = [name.strip('"') for name in names if name]
+    if names == ["*"] or not names:
+        return None
+    return names
+
+# Values bound into SQLite: numpy scalars, dates and nested objects become plain Python
+def to_sql_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def sql_type(value):
+    if isinstance(value, bool):
+        return "INTEGER"
+    if isinstance(value, int):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+def table_columns(conn, table_name):
+    return [row["name"] for row in conn.execute(f"PRAGMA table_info({quote(table_name)})")]
+
+# Create the table on first write and add any new columns on later writes
+def ensure_table(conn, table_name, rows):
+    keys = []
+    for row in rows:
+        for key in row:
+            if key not in keys:
+                keys.append(key)
+
+    def column_type(key):
+        for row in rows:
+            if row.get(key) is not None:
+                return sql_type(row[key])
+        return ""
+
+    existing = table_columns(conn, table_name)
+    if not existing:
+        definitions = []
+        if "id" in keys:
+            definitions.append('"id" INTEGER PRIMARY KEY')
+        elif "uuid" in keys:
+            definitions.append('"uuid" TEXT PRIMARY KEY')
+        else:
+            definitions.append('"id" INTEGER PRIMARY KEY AUTOINCREMENT')
+        if "created_at" not in keys:
+            definitions.append("\"created_at\" TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))")
+        for key in keys:
+            if key in ("id", "uuid") and definitions[0].startswith(quote(key)):
+                continue
+            definitions.append(f"{quote(key)} {column_type(key)}".strip())
+        conn.execute(f"CREATE TABLE {quote(table_name)} ({', '.join(definitions)})")
+        return
+
+    for key in keys:
+        if key not in existing:
+            conn.execute(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(key)} {column_type(key)}".rstrip())
+
+# NULLs are written as empty fields, as PostgREST does
+def csv_text(cursor):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([column[0] for column in cursor.description])
+    writer.writerows(cursor)
+    return buffer.getvalue()
+
+class LocalResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+#%% Query Builder
+
+class LocalQuery:
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+        self.action = "select"
+        self.columns = None
+        self.count = None
+        self.filters = []
+        self.order_by = []
+        self.offset = None
+        self.limit_rows = None
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.as_csv = False
+
+    # Actions
+
+    def select(self, *columns, count=None):
+        self.action = "select"
+        self.columns = parse_columns(",".join(columns) or "*")
+        self.count = count
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action = "insert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict="", ignore_duplicates=False, **kwargs):
+        self.action = "upsert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        self.on_conflict = parse_columns(on_conflict) if on_conflict else None
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values, **kwargs):
+        self.action = "update"
+        self.payload = values
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    # Filters
+
+    def add_filter(self, column, operator, value):
+        self.filters.append((column.strip('"'), operator, value))
+        return self
+
+    def eq(self, column, value):
+        return self.add_filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self.add_filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self.add_filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self.add_filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self.add_filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self.add_filter(column, "<=", value)
+
+    def in_(self, column, values):
+        return self.add_filter(column, "IN", list(values))
+
+    def order(self, column, desc=False, **kwargs):
+        self.order_by.append((column.strip('"'), desc))
+        return self
+
+    def range(self, start, end):
+        self.offset = start
+        self.limit_rows = end - start + 1
+        return self
+
+    def limit(self, size, **kwargs):
+        self.limit_rows = size
+        return self
+
+    # Like postgrest, execute() then returns a response whose data is the CSV text
+    def csv(self):
+        self.as_csv = True
+        return self
+
+    # SQL
+
+    def where_clause(self):
+        clauses = []
+        params = []
+        for column, operator, value in self.filters:
+            if operator == "IN":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{quote(column)} IN ({', '.join('?' for _ in value)})")
+                params.extend(to_sql_value(v) for v in value)
+            elif value is None and operator in ("=", "!="):
+                clauses.append(f"{quote(column)} IS {'NOT ' if operator == '!=' else ''}NULL")
+            else:
+                clauses.append(f"{quote(column)} {operator} ?")
+                params.append(to_sql_value(value))
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    def execute(self):
+        with closing(connect(self.client.path)) as conn:
+            if self.action == "select":
+                return self.run_select(conn)
+            with _write_lock:
+                if self.action in ("insert", "upsert"):
+                    response = self.run_insert(conn)
+                elif self.action == "update":
+                    response = self.run_update(conn)
+                else:
+                    response = self.run_delete(conn)
+                conn.commit()
+            # local event source: writes invalidate cached copies of the table straight away
+            notify_change(self.table_name, "local")
+            return response
+
+    def run_select(self, conn):
+        if not table_columns(conn, self.table_name):
+            return LocalResponse([], 0 if self.count else None)
+
+        where, params = self.where_clause()
+        count = None
+        if self.count:
+            count = conn.execute(f"SELECT COUNT(*) FROM {quote(self.table_name)}{where}", params).fetchone()[0]
+
+        columns = "*" if self.columns is None else ", ".join(quote(c) for c in self.columns)
+        sql = f"SELECT {columns} FROM {quote(self.table_name)}{where}"
+        if self.order_by:
+            sql += " ORDER BY " + ", ".join(f"{quote(c)}{' DESC' if desc else ''}" for c, desc in self.order_by)
+        else:
+            sql += " ORDER BY rowid"
+        if self.limit_rows is not None:
+            sql += f" LIMIT {int(self.limit_rows)} OFFSET {int(self.offset or 0)}"
+
+        cursor = conn.execute(sql, params)
+        if self.as_csv:
+            return LocalResponse(csv_text(cursor), count)
+        rows = [dict(row) for row in cursor]
+        return LocalResponse(rows, count)
+
+    def run_insert(self, conn):
+        rows = [{key: to_sql_value(value) for key, value in row.items()} for row in self.payload]
+        if not rows:
+            return LocalResponse([])
+        ensure_table(conn, self.table_name, rows)
+
+        conflict = ""
+        if self.action == "upsert":
+            conflict_columns = self.on_conflict or [c for c in ("id", "uuid") if c in rows[0]][:1]
+            if conflict_columns:
+                index_name = f"upsert_{self.table_name}_{'_'.join(conflict_columns)}"
+                conn.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {quote(index_name)} "
+                    f"ON {quote(self.table_name)} ({', '.join(quote(c) for c in conflict_columns)})"
+                )
+                conflict = f" ON CONFLICT ({', '.join(quote(c) for c in conflict_columns)}) "
+                if self.ignore_duplicates:
+                    conflict += "DO NOTHING"
+                else:
+                    updates = [c for c in rows[0] if c not in conflict_columns]
+                    if updates:
+                        conflict += "DO UPDATE SET " + ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in updates)
+                    else:
+                        conflict += "DO NOTHING"
+
+        row_ids = []
+        for row in rows:
+            keys = list(row)
+            # RETURNING gives the rowid for inserted and upsert-updated rows, and nothing for skipped ones
+            returned = conn.execute(
+                f"INSERT INTO {quote(self.table_name)} ({', '.join(quote(k) for k in keys)}) "
+                f"VALUES ({', '.join('?' for _ in keys)}){conflict} RETURNING rowid",
+                [row[k] for k in keys],
+            ).fetchone()
+            if returned is not None:
+                row_ids.append(returned[0])
+
+        return LocalResponse(self.rows_by_rowid(conn, row_ids))
+
+    def run_update(self, conn):
+        values = {key: to_sql_value(value) for key, value in self.payload.items()}
+        ensure_table(conn, self.table_name, [values])
+        where, params = self.where_clause()
+        row_ids = [row[0] for row in conn.execute(f"SELECT rowid FROM {quote(self.table_name)}{where}", params)]
+        if values and row_ids:
+            assignments = ", ".join(f"{quote(k)} = ?" for k in values)
+            conn.execute(
+                f"UPDATE {quote(self.table_name)} SET {assignments} "
+                f"WHERE rowid IN ({', '.join('?' for _ in row_ids)})",
+                list(values.values()) + row_ids,
+            )
+        return LocalResponse(self.rows_by_rowid(conn, row_ids))
+
+    def run_delete(self, conn):
+        if not table_columns(conn, self.table_name):
+            return LocalResponse([])
+        where, params = self.where_clause()
+        rows = [dict(row) for row in conn.execute(f"SELECT * FROM {quote(self.table_name)}{where}", params)]
+        conn.execute(f"DELETE FROM {quote(self.table_name)}{where}", params)
+        return LocalResponse(rows)
+
+    def rows_by_rowid(self, conn, row_ids):
+        if not row_ids:
+            return []
+        return [
+            dict(row) for row in conn.execute(
+                f"SELECT * FROM {quote(self.table_name)} WHERE rowid IN ({', '.join('?' for _ in row_ids)}) ORDER BY rowid",
+                row_ids,
+            )
+        ]
+
+#%% Storage
+
+class LocalBucket:
+    def __init__(self, folder):
+        self.folder = folder
+
+    def list(self, path=None, options=None):
+        folder = os.path.join(self.folder, path) if path else self.folder
+        if not os.path.isdir(folder):
+            return []
+        return [{"name": name} for name in sorted(os.listdir(folder))]
+
+    def upload(self, path, file, file_options=None):
+        target = os.path.join(self.folder, path)
+        if os.path.exists(target):
+            raise FileExistsError(f"'{path}' already exists in bucket")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as handle:
+            handle.write(file if isinstance(file, bytes) else file.read())
+        return {"Key": path}
+
+    def get_public_url(self, path):
+        return os.path.abspath(os.path.join(self.folder, path))
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def from_(self, bucket):
+        return LocalBucket(os.path.join(self.root, bucket))
+
+#%% Client
+
+class LocalClient:
+    def __init__(self, path, storage_root):
+        self.path = path
+        self.storage = LocalStorage(storage_root)
+
+    def table(self, table_name):
+        return LocalQuery(self, table_name)
+
+    def from_(self, table_name):
+        return self.table(table_name)
+
+    def rpc(self, function_name, params=None):
+        raise APIError({
+            "message": f"Could not find the function {function_name} in the local backend",
+            "code": "PGRST202",
+            "hint": None,
+            "details": None,
+        })
+
+# Mirrors st.connection(..., type=SupabaseConnection): pages use db.client and db.table
+class LocalConnection:
+    def __init__(self, path, storage_root):
+        self.client = LocalClient(path, storage_root)
+
+    def table(self, table_name):
+        return self.client.table(table_name)
+
+_connection = None
+_connection_lock = threading.Lock()
+
+def get_local_db():
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = LocalConnection(local_db_path(), local_storage_dir())
+    return _connection
+
+#%% Seeding
+
+# Replace a local table with the rows of a DataFrame (e.g. an export of the live table)
+def seed_table(table_name, df):
+    client = get_local_db().client
+    with closing(connect(client.path)) as conn, _write_lock:
+        conn.execute(f"DROP TABLE IF EXISTS {quote(table_name)}")
+        conn.commit()
+    rows = df.replace({np.nan: None}).to_dict(orient="records")
+    for start in range(0, len(rows), 1000):
+        client.table(table_name).insert(rows[start:start + 1000]).execute()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "seed":
+        print("usage: python -m data_access.local_backend seed <table_name> <csv_path>")
+        sys.exit(1)
+    seed_table(sys.argv[2], pd.read_csv(sys.argv[3]))
+    print(f"Seeded '{sys.argv[2]}' in {local_db_path()}")
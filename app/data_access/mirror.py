@@ -0,0 +1,168 @@
+#%% Imports
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from data_access.settings import mirror_path
+
+logger = logging.getLogger(__name__)
+
+#%% Mirrored Tables
+
+# Append-only sensor tables kept in a local SQLite mirror: table -> (high-water mark column, row key column).
+# The mirror serves whole-table reads (fetch_table_data / download_table), which the pages no longer make for
+# these tables, so today it is used by scripts and notebooks that load a full sensor table.
+# The mark column has to be filled by the server on insert (an id sequence, a created_at default); full_sync
+# warns when it isn't, since every refresh is then a full download.
+MIRROR_TABLES = {
+    "swings": ("created_at", "uuid"),
+    "rapsodo_hitting": ("id", "id"),
+    "rapsodo_pitching": ("id", "id"),
+}
+
+# One lock per table so two sessions don't refresh the same mirror at once
+_locks = {table_name: threading.Lock() for table_name in MIRROR_TABLES}
+
+# Tables already warned about a missing high-water mark in this process
+_no_mark = set()
+
+#%% Mirror Storage
+
+def connect():
+    path = mirror_path()
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS mirror_meta ("
+        "table_name TEXT PRIMARY KEY, mark TEXT, columns TEXT, synced_at TEXT)"
+    )
+    return conn
+
+def mirror_table(table_name):
+    return f"mirror_{table_name}"
+
+def read_meta(conn, table_name):
+    row = conn.execute(
+        "SELECT mark, columns FROM mirror_meta WHERE table_name = ?", (table_name,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"mark": row[0], "columns": json.loads(row[1])}
+
+def write_meta(conn, table_name, mark, columns):
+    conn.execute(
+        "INSERT OR REPLACE INTO mirror_meta (table_name, mark, columns, synced_at) VALUES (?, ?, ?, ?)",
+        (table_name, mark, json.dumps(columns), datetime.now(timezone.utc).isoformat()),
+    )
+
+# Highest mark value in a batch, kept as text (ids stay numeric strings, timestamps ISO strings)
+def high_water_mark(df, mark_column):
+    # Without the mark column there is nothing to resume from, so every refresh is a full sync
+    if mark_column not in df.columns:
+        return None
+    values = df[mark_column].dropna()
+    if values.empty:
+        return None
+    if pd.api.types.is_numeric_dtype(values):
+        return str(values.max())
+    return pd.to_datetime(values, utc=True).max().isoformat()
+
+# Frames come back from download_query indexed by id/uuid; the mirror stores plain columns
+def as_rows(df):
+    if df.index.name in ("id", "uuid"):
+        return df.reset_index()
+    return df
+
+#%% Sync
+
+# Replace the mirror with a full download (first run, or when the table's columns changed)
+def full_sync(conn, table_name, download):
+    mark_column, key_column = MIRROR_TABLES[table_name]
+    df = as_rows(download(table_name, None, ()))
+    mark = high_water_mark(df, mark_column)
+    if mark is None and not df.empty and table_name not in _no_mark:
+        _no_mark.add(table_name)
+        state = "has no" if mark_column not in df.columns else "has only empty values in"
+        logger.warning(
+            "%s %s its high-water mark column %s; its mirror can't pull just new rows, so every refresh "
+            "downloads the whole table", table_name, state, mark_column,
+        )
+
+    conn.execute(f'DROP TABLE IF EXISTS "{mirror_table(table_name)}"')
+    if len(df.columns):
+        df.to_sql(mirror_table(table_name), conn, if_exists="replace", index=False)
+    write_meta(conn, table_name, mark, list(df.columns))
+    conn.commit()
+
+# Fetch only rows at or past the high-water mark and append them.
+# Rows sharing the mark (e.g. one upload with a single created_at) are fetched again, so existing keys are replaced.
+def delta_sync(conn, table_name, download, meta):
+    mark_column, key_column = MIRROR_TABLES[table_name]
+    new = as_rows(download(table_name, None, (("gte", mark_column, meta["mark"]),)))
+
+    if new.empty:
+        return
+
+    # Column set changed on the server: the mirror's layout is stale, start over
+    if sorted(new.columns) != sorted(meta["columns"]):
+        full_sync(conn, table_name, download)
+        return
+
+    keys = [str(key) for key in new[key_column]]
+    conn.executemany(
+        f'DELETE FROM "{mirror_table(table_name)}" WHERE CAST("{key_column}" AS TEXT) = ?',
+        [(key,) for key in keys],
+    )
+    new[meta["columns"]].to_sql(mirror_table(table_name), conn, if_exists="append", index=False)
+    write_meta(conn, table_name, high_water_mark(new, mark_column), meta["columns"])
+    conn.commit()
+
+# Bring the mirror up to date with the server; download(table_name, columns, filters) returns a frame
+def refresh_mirror(table_name, download):
+    with _locks[table_name], closing(connect()) as conn:
+        meta = read_meta(conn, table_name)
+        if meta is None or meta["mark"] is None:
+            full_sync(conn, table_name, download)
+        else:
+            delta_sync(conn, table_name, download, meta)
+
+# Throw the mirror away and download the table again
+def resync_mirror(table_name, download):
+    with _locks[table_name], closing(connect()) as conn:
+        full_sync(conn, table_name, download)
+
+# Throw the mirror away without downloading; whichever process reads the table next does a full sync
+def drop_mirror(table_name):
+    with _locks[table_name], closing(connect()) as conn:
+        conn.execute(f'DROP TABLE IF EXISTS "{mirror_table(table_name)}"')
+        conn.execute("DELETE FROM mirror_meta WHERE table_name = ?", (table_name,))
+        conn.commit()
+
+#%% Read
+
+def read_mirror(table_name, download):
+    refresh_mirror(table_name, download)
+
+    with closing(connect()) as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (mirror_table(table_name),)
+        ).fetchone()
+        if exists is None:
+            return pd.DataFrame()
+        df = pd.read_sql(f'SELECT * FROM "{mirror_table(table_name)}"', conn)
+
+    # Set index to 'id' if it exists, otherwise 'uuid' (same as a direct download)
+    if 'id' in df.columns:
+        df.set_index('id', inplace=True)
+    elif 'uuid' in df.columns:
+        df.set_index('uuid', inplace=True)
+    return df
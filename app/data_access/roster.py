@@ -0,0 +1,69 @@
+#%% Imports
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from data_access.tables import cached_fetch, fetch_table_data
+
+#%% Class Years
+
+# assign class levels to index of years
+CLASS_NAMES = {
+        0: "Grad",
+        1: "Senior",
+        2: "Junior",
+        3: "Sophomore",
+        4: "Freshman",
+        5: "Middle"
+}
+
+ACTIVE_CLASSES = ['Freshman', 'Sophomore', 'Junior', 'Senior']
+
+# Class name per player from years left until Sept 1 of the grad year, capped within 0-5
+def class_years(grad_years, today):
+    grad_years = pd.to_numeric(grad_years, errors='coerce')
+    sept_first = pd.to_datetime(
+        pd.DataFrame({"year": grad_years, "month": 9, "day": 1}, index=grad_years.index),
+        errors='coerce',
+    )
+    years_diff = np.ceil((sept_first - pd.Timestamp(today)).dt.days / 365).clip(0, 5)
+    return years_diff.map(CLASS_NAMES).fillna("Unknown")
+
+#%% Roster
+
+# Display version of players plus the frames and dropdown options every page builds from it
+def derive_roster(players, today):
+    players_show = players.copy()
+    if players_show.empty:
+        players_show = pd.DataFrame(columns=['grad_year', 'first_name', 'last_name'])
+
+    players_show['class'] = class_years(players_show['grad_year'], today)
+    players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
+    players_show['active'] = players_show['class'].isin(ACTIVE_CLASSES)
+
+    currentplayers = players_show[players_show['active']]
+    return {
+        "players_show": players_show,
+        "currentplayers": currentplayers,
+        "player_options": players_show['full_name'].to_dict(),
+        "active_player_options": currentplayers['full_name'].to_dict(),
+    }
+
+# Cached under the players table, so it is rebuilt when players change, and under today's date,
+# so class years roll over at midnight
+def get_roster():
+    today = date.today()
+    roster = cached_fetch(
+        ("players", "roster", today.isoformat()),
+        lambda: derive_roster(fetch_table_data('players'), today),
+    )
+
+    # Pages edit these, so hand out copies
+    return {
+        "players_show": roster["players_show"].copy(deep=False),
+        "currentplayers": roster["currentplayers"].copy(deep=False),
+        "player_options": dict(roster["player_options"]),
+        "active_player_options": dict(roster["active_player_options"]),
+    }
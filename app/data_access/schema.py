@@ -0,0 +1,123 @@
+#%% Imports
+
+import pandas as pd
+
+#%% Column Types
+
+FLOAT = "float32"
+DATE = "datetime64[ns]"
+CATEGORY = "category"
+
+# Rapsodo exports write "-" where a measurement is missing
+NA_SENTINELS = ["-"]
+
+# Types applied once when a table is fetched, so pages don't re-run pd.to_numeric / pd.to_datetime on every rerun.
+# Columns missing from a frame (e.g. left out of a projection) are skipped.
+TABLE_SCHEMAS = {
+    "swings": {
+        "created_date": DATE,
+        "swing_power": FLOAT,
+        "max_acceleration": FLOAT,
+        "impact_momentum": FLOAT,
+        "max_hand_speed": FLOAT,
+        "max_barrel_speed": FLOAT,
+        "speed_efficiency": FLOAT,
+        "trigger_to_impact": FLOAT,
+        "attack_angle": FLOAT,
+        "hand_cast": FLOAT,
+        "distance_in_zone": FLOAT,
+        "sensor_time_sec": FLOAT,
+        "vertical_angle": FLOAT,
+        "barrel_x": FLOAT,
+        "barrel_y": FLOAT,
+        "barrel_z": FLOAT,
+        "exit_velocity": FLOAT,
+        "potential_distance": FLOAT,
+        "bat_length": FLOAT,
+    },
+    "rapsodo_hitting": {
+        "Date": DATE,
+        "ExitVelocity": FLOAT,
+        "LaunchAngle": FLOAT,
+        "Distance": FLOAT,
+    },
+    "rapsodo_pitching": {
+        "Date": DATE,
+        "Pitch Type": CATEGORY,
+        "Intent Type": CATEGORY,
+        "pitch_type": CATEGORY,
+        "HB (trajectory)": FLOAT,
+        "VB (trajectory)": FLOAT,
+        "Velocity": FLOAT,
+        "Total Spin": FLOAT,
+        "Spin Efficiency (release)": FLOAT,
+        "Release Angle": FLOAT,
+        "Release Height": FLOAT,
+        "Release Side": FLOAT,
+    },
+    "players": {
+        "pos_1": CATEGORY,
+        "pos_2": CATEGORY,
+        "pos_3": CATEGORY,
+    },
+}
+
+#%% Pitch Types
+
+# Rapsodo pitch types under the names the app shows; written to rapsodo_pitching.pitch_type at upload
+# (sql/pitch_types.sql), "-" and blanks become missing
+PITCH_TYPE_NAMES = {
+    "Fastball": "Four Seam",
+    "TwoSeamFastball": "Two Seam",
+    "Cutter": "Cutter",
+    "Slider": "Slider",
+    "CurveBall": "Curveball",
+    "ChangeUp": "Changeup",
+    "Splitter": "Splitter",
+    "Other": "Other",
+}
+
+def pitch_type_name(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)) or value in NA_SENTINELS or value == "":
+        return None
+    return PITCH_TYPE_NAMES.get(value, value)
+
+#%% CSV Reads
+
+# read_csv arguments that give a CSV download the same types apply_schema would.
+# Only "" (SQL NULL) counts as missing, plus the "-" sentinel in metric columns, so text like "NA" survives.
+def csv_read_options(table_name, columns):
+    schema = TABLE_SCHEMAS.get(table_name, {})
+    dtype = {}
+    na_values = {}
+    for column in columns:
+        na_values[column] = [""]
+        if schema.get(column) == FLOAT:
+            dtype[column] = FLOAT
+            na_values[column] = [""] + NA_SENTINELS
+    return {"dtype": dtype, "na_values": na_values, "keep_default_na": False}
+
+#%% Apply
+
+def apply_schema(table_name, df):
+    schema = TABLE_SCHEMAS.get(table_name)
+    if not schema:
+        return df
+
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+
+        values = df[column]
+        if values.dtype == dtype:
+            continue
+
+        if dtype == FLOAT:
+            # "-" and any other text fails to parse and becomes NaN
+            df[column] = pd.to_numeric(values, errors='coerce').astype(FLOAT)
+        elif dtype == DATE:
+            df[column] = pd.to_datetime(values, errors='coerce')
+        elif dtype == CATEGORY:
+            df[column] = values.mask(values.isin(NA_SENTINELS)).astype(CATEGORY)
+
+    return df
@@ -0,0 +1,113 @@
+#%% Imports
+
+import os
+
+#%% Settings
+
+# Data access settings are read from environment variables so they can be tuned per deployment.
+# Streamlit also exports root-level entries of secrets.toml as environment variables.
+def get_setting(name, default, cast=str):
+    value = os.environ.get(f"DP_{name}")
+    if value in (None, ""):
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        return default
+
+# seconds a fetched table stays cached before it is downloaded again
+def cache_ttl():
+    return get_setting("CACHE_TTL", 600, int)
+
+# memory ceiling in MB for the process-wide table cache shared by every session
+def cache_max_bytes():
+    return max(get_setting("CACHE_MAX_MB", 512, int), 1) * 1024 * 1024
+
+# number of .range() windows of one table downloaded at the same time
+def fetch_workers():
+    return max(1, get_setting("FETCH_WORKERS", 4, int))
+
+# local SQLite file holding the mirror of the append-only sensor tables
+def mirror_path():
+    return get_setting("MIRROR_PATH", os.path.join(".dp_cache", "mirror.sqlite"))
+
+# set DP_MIRROR=0 to always download the sensor tables directly
+def mirror_enabled():
+    return get_setting("MIRROR", 1, int) == 1
+
+# set DP_SERVER_AGGREGATES=0 to compute leaderboards in pandas instead of the database functions
+def server_aggregates():
+    return get_setting("SERVER_AGGREGATES", 1, int) == 1
+
+# "supabase" (default) or "local" for the SQLite stand-in
+def backend():
+    return get_setting("BACKEND", "supabase").lower()
+
+# SQLite file and storage folder used by the local backend
+def local_db_path():
+    return get_setting("LOCAL_DB", os.path.join(".dp_cache", "local.sqlite"))
+
+def local_storage_dir():
+    return get_setting("LOCAL_STORAGE", os.path.join(".dp_cache", "storage"))
+
+# set DP_CSV_TRANSFER=0 to download the sensor tables as JSON rows instead of CSV
+def csv_transfer():
+    return get_setting("CSV_TRANSFER", 1, int) == 1
+
+# HTTP pool shared by table and storage calls: open connections, idle keep-alive connections,
+# retries for idempotent requests and the base backoff in seconds (doubled per retry, with jitter)
+def http_max_connections():
+    return max(get_setting("HTTP_MAX_CONNECTIONS", 20, int), 1)
+
+def http_keepalive():
+    return max(get_setting("HTTP_KEEPALIVE", 10, int), 0)
+
+def http_retries():
+    return max(get_setting("HTTP_RETRIES", 3, int), 0)
+
+def http_backoff():
+    return get_setting("HTTP_BACKOFF", 0.25, float)
+
+# How cached tables learn about changes made outside this app: "poll" (default), "realtime" or "off",
+# and the seconds between polls (also used when the realtime feed drops)
+def change_source():
+    return get_setting("CHANGE_SOURCE", "poll").lower()
+
+def change_poll_seconds():
+    return max(get_setting("CHANGE_POLL", 30, float), 1)
+
+# CSV uploads: rows parsed per chunk (bounds memory) and rows per insert request
+def ingest_chunk_rows():
+    return max(get_setting("INGEST_CHUNK_ROWS", 5000, int), 1)
+
+def ingest_batch_rows():
+    return max(get_setting("INGEST_BATCH_ROWS", 500, int), 1)
+
+# Background upload jobs: SQLite queue file, folder holding uploaded files until their job is done,
+# and worker threads per process
+def jobs_db_path():
+    return get_setting("JOBS_DB", os.path.join(".dp_cache", "jobs.sqlite"))
+
+def jobs_spool_dir():
+    return get_setting("JOBS_SPOOL", os.path.join(".dp_cache", "uploads"))
+
+def job_workers():
+    return max(get_setting("JOB_WORKERS", 1, int), 1)
+
+# SQLite file recording finished uploads by content hash and the last batch each unfinished upload committed
+def upload_checkpoints_path():
+    return get_setting("UPLOAD_CHECKPOINTS", os.path.join(".dp_cache", "checkpoints.sqlite"))
+
+# Rotating JSON log of every rerun's table and storage calls
+def io_log_path():
+    return get_setting("IO_LOG_PATH", os.path.join(".dp_cache", "io_log.jsonl"))
+
+def io_log_max_bytes():
+    return get_setting("IO_LOG_MAX_BYTES", 1_000_000, int)
+
+def io_log_backups():
+    return get_setting("IO_LOG_BACKUPS", 3, int)
+
+# Comma-separated emails that see the I/O debug panel, on top of users with type "Admin"
+def admin_emails():
+    return [email.strip().lower() for email in get_setting("ADMIN_EMAILS", "").split(",") if email.strip()]
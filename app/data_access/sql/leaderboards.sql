@@ -0,0 +1,110 @@
+-- Leaderboard aggregations run in the database, so the app downloads one row per player instead of every swing/pitch.
+-- Load into Supabase with the SQL editor, or into a local Postgres stand-in with:
+--   psql "$DATABASE_URL" -f app/data_access/sql/leaderboards.sql
+-- PostgREST exposes each function as client.rpc('<name>', {...}).
+-- Player filters are passed as id lists, so class/active filtering stays exactly as the app computes it.
+
+-- Diamond Kinetics: max / mean / 90th percentile / std per player
+create or replace function dk_leaderboard(start_date date, end_date date, player_ids bigint[])
+returns table (
+    player_id bigint,
+    hand_speed_max double precision,
+    hand_speed_avg double precision,
+    hand_speed_90 double precision,
+    hand_speed_std double precision,
+    barrel_speed_max double precision,
+    barrel_speed_avg double precision,
+    barrel_speed_90 double precision,
+    barrel_speed_std double precision,
+    attack_angle_avg double precision,
+    attack_angle_std double precision,
+    impact_momentum_avg double precision,
+    impact_momentum_std double precision,
+    trigger_to_impact_avg double precision,
+    trigger_to_impact_std double precision,
+    hand_cast_avg double precision,
+    hand_cast_std double precision,
+    barrel_x_avg double precision,
+    barrel_x_std double precision,
+    barrel_y_avg double precision,
+    barrel_y_std double precision,
+    barrel_z_avg double precision,
+    barrel_z_std double precision
+)
+language sql stable
+as $$
+    select
+        s.player_id,
+        max(s.max_hand_speed::double precision),
+        avg(s.max_hand_speed::double precision),
+        percentile_cont(0.9) within group (order by s.max_hand_speed::double precision),
+        stddev_samp(s.max_hand_speed::double precision),
+        max(s.max_barrel_speed::double precision),
+        avg(s.max_barrel_speed::double precision),
+        percentile_cont(0.9) within group (order by s.max_barrel_speed::double precision),
+        stddev_samp(s.max_barrel_speed::double precision),
+        avg(s.attack_angle::double precision),
+        stddev_samp(s.attack_angle::double precision),
+        avg(s.impact_momentum::double precision),
+        stddev_samp(s.impact_momentum::double precision),
+        avg(s.trigger_to_impact::double precision),
+        stddev_samp(s.trigger_to_impact::double precision),
+        avg(s.hand_cast::double precision),
+        stddev_samp(s.hand_cast::double precision),
+        avg(s.barrel_x::double precision),
+        stddev_samp(s.barrel_x::double precision),
+        avg(s.barrel_y::double precision),
+        stddev_samp(s.barrel_y::double precision),
+        avg(s.barrel_z::double precision),
+        stddev_samp(s.barrel_z::double precision)
+    from swings s
+    where s.created_date::date between start_date and end_date
+      and s.player_id = any(player_ids)
+    group by s.player_id
+$$;
+
+-- Rapsodo hitting: exit velocity max / mean / 90th percentile per Rapsodo player
+create or replace function rapsodo_hitting_leaderboard(start_date date, end_date date, rapsodo_ids text[])
+returns table (
+    rapsodo_id text,
+    exit_velocity_max double precision,
+    exit_velocity_avg double precision,
+    exit_velocity_90 double precision
+)
+language sql stable
+as $$
+    with hits as (
+        select
+            h."Player ID"::text as rapsodo_id,
+            nullif(h."ExitVelocity"::text, '-')::double precision as exit_velocity
+        from rapsodo_hitting h
+        where h."Date"::date between start_date and end_date
+          and h."Player ID"::text = any(rapsodo_ids)
+    )
+    select
+        rapsodo_id,
+        max(exit_velocity),
+        avg(exit_velocity),
+        percentile_cont(0.9) within group (order by exit_velocity)
+    from hits
+    group by rapsodo_id
+$$;
+
+-- Rapsodo pitching: average release point per Rapsodo player
+create or replace function rapsodo_release_leaderboard(start_date date, end_date date, rapsodo_ids text[])
+returns table (
+    rapsodo_id text,
+    release_side_mean double precision,
+    release_height_mean double precision
+)
+language sql stable
+as $$
+    select
+        p."Player ID"::text,
+        avg(nullif(p."Release Side"::text, '-')::double precision),
+        avg(nullif(p."Release Height"::text, '-')::double precision)
+    from rapsodo_pitching p
+    where p."Date"::date between start_date and end_date
+      and p."Player ID"::text = any(rapsodo_ids)
+    group by p."Player ID"::text
+$$;
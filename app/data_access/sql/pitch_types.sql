@@ -0,0 +1,14 @@
+-- Pitch type and intent worked out once per pitch at upload (data_access/ingest.py normalize_pitching),
+-- instead of renaming pitch types on every page view.
+-- Load into Supabase with the SQL editor, or into a local Postgres stand-in with:
+--   psql "$DATABASE_URL" -f app/data_access/sql/pitch_types.sql
+-- before deploying the upload change, then fill the rows already stored with:
+--   cd app && python -m data_access.ingest backfill
+-- with the app's DP_MIRROR_PATH, so the app's local mirror is dropped and downloaded again; an app process
+-- with a mirror elsewhere must call resync_table_mirror("rapsodo_pitching") (or delete its mirror file).
+-- pitch_type holds the app's name for the Rapsodo pitch type ("Four Seam", "Curveball", ...; NULL for "-"),
+-- high_intent whether "Intent Type" is high_intent. Both group the pitching summaries (summaries.py), which the
+-- backfill rebuilds.
+
+alter table rapsodo_pitching add column if not exists pitch_type text;
+alter table rapsodo_pitching add column if not exists high_intent boolean;
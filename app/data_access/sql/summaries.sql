@@ -0,0 +1,24 @@
+-- Per-player, per-day summaries of the sensor tables, written by uploads (data_access/summaries.py) so the player
+-- page and leaderboards read a few hundred summary rows instead of every swing/pitch.
+-- Load into Supabase with the SQL editor, or into a local Postgres stand-in with:
+--   psql "$DATABASE_URL" -f app/data_access/sql/summaries.sql
+-- then fill it from the rows already stored with:
+--   cd app && python -m data_access.summaries rebuild
+-- One row per source table, player (player_id or Rapsodo id, as text), day, pitch type / intent ('high' or 'low'
+-- from rapsodo_pitching.high_intent; both empty for swings and hitting) and metric; metric 'rows' counts the raw
+-- rows. sketch maps values rounded to 0.1 to their counts.
+
+create table if not exists daily_summaries (
+    source text not null,
+    player text not null,
+    day date not null,
+    pitch_type text not null default '',
+    intent_type text not null default '',
+    metric text not null,
+    n bigint not null,
+    total double precision,
+    total_sq double precision,
+    max double precision,
+    sketch jsonb not null default '{}'::jsonb,
+    primary key (source, player, day, pitch_type, intent_type, metric)
+);
@@ -0,0 +1,9 @@
+-- Natural keys of the upload tables, so data_access/ingest.py can send each batch as an
+-- insert-or-ignore upsert (INSERT ... ON CONFLICT DO NOTHING) instead of looking up existing keys first.
+-- Load into Supabase with the SQL editor, or into a local Postgres stand-in with:
+--   psql "$DATABASE_URL" -f app/data_access/sql/unique_keys.sql
+-- Existing duplicate rows have to be removed before an index can be created.
+
+create unique index if not exists rapsodo_pitching_pitch_id_key on rapsodo_pitching ("Pitch ID");
+create unique index if not exists rapsodo_hitting_hit_id_key on rapsodo_hitting ("HitID");
+create unique index if not exists swings_uuid_key on swings (uuid);
@@ -0,0 +1,309 @@
+#%% Imports
+
+import json
+import logging
+import math
+import sys
+
+import numpy as np
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from data_access.changes import on_table_change
+from data_access.connection import get_db
+from data_access.settings import ingest_batch_rows
+from data_access.tables import clear_table_cache, download_query, fetch_table_query
+
+logger = logging.getLogger(__name__)
+
+#%% Summary Sources
+#
+# Per-player, per-day summaries of the sensor tables, kept in daily_summaries (sql/summaries.sql) and updated
+# by uploads as rows land. Each summary row holds one metric of one player on one day (and pitch type /
+# intent for pitches): count, sum, sum of squares, max and a sketch of the values, so any date range
+# combines into mean, std, max and quantiles from a few hundred rows instead of every swing or pitch.
+# The pseudo metric "rows" counts the raw rows of the group.
+
+SUMMARY_TABLE = "daily_summaries"
+KEY_COLUMNS = ["source", "player", "day", "pitch_type", "intent_type", "metric"]
+VALUE_COLUMNS = ["n", "total", "total_sq", "max", "sketch"]
+ROWS = "rows"
+
+# source table -> player column, date column, group columns (summary column -> table column) and metrics.
+# Pitches are grouped by the pitch type and intent flag worked out at upload (ingest.normalize_pitching).
+SUMMARY_SOURCES = {
+    "swings": {
+        "player": "player_id", "date": "created_date", "groups": {},
+        "metrics": [
+            "max_hand_speed", "max_barrel_speed", "impact_momentum", "attack_angle", "trigger_to_impact",
+            "hand_cast", "barrel_x", "barrel_y", "barrel_z",
+        ],
+    },
+    "rapsodo_hitting": {
+        "player": "Player ID", "date": "Date", "groups": {},
+        "metrics": ["ExitVelocity"],
+    },
+    "rapsodo_pitching": {
+        "player": "Player ID", "date": "Date", "groups": {"pitch_type": "pitch_type", "intent_type": "high_intent"},
+        "metrics": [
+            "HB (trajectory)", "VB (trajectory)", "Velocity", "Total Spin",
+            "Spin Efficiency (release)", "Release Angle", "Release Height", "Release Side",
+        ],
+    },
+}
+
+# Sketches count values rounded to this step, the resolution the sensors report at, so quantiles
+# match the raw rows while a day's sketch stays a few dozen entries
+SKETCH_STEP = 0.1
+
+# Summaries stay unused for the life of the process once the table is found missing (sql/summaries.sql not loaded)
+_unavailable = set()
+
+# high_intent flag -> intent_type: "high", "low" or missing
+def intent_name(flag):
+    if flag is None or pd.isna(flag):
+        return None
+    return "high" if flag in (True, "true", "True") else "low"
+
+def source_columns(source):
+    spec = SUMMARY_SOURCES[source]
+    return [spec["player"], spec["date"], *spec["groups"].values(), *spec["metrics"]]
+
+# Player ids (swings) and Rapsodo ids come back as ints, floats or text; summaries key them as plain text
+def player_key(value):
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    return str(value)
+
+#%% Sketches
+
+def load_sketch(sketch):
+    if sketch is None or (isinstance(sketch, float) and math.isnan(sketch)):
+        return {}
+    return json.loads(sketch) if isinstance(sketch, str) else sketch
+
+def merge_sketches(sketches):
+    merged = {}
+    for sketch in sketches:
+        for value, count in load_sketch(sketch).items():
+            merged[value] = merged.get(value, 0) + count
+    return merged
+
+# Quantile with pandas' linear interpolation, over the counted values
+def sketch_quantile(sketch, q):
+    sketch = load_sketch(sketch)
+    if not sketch:
+        return np.nan
+    values = sorted((float(value), count) for value, count in sketch.items())
+    total = sum(count for _, count in values)
+
+    # the index-th value of the sorted, expanded list
+    def value_at(index):
+        seen = 0
+        for value, count in values:
+            seen += count
+            if index < seen:
+                return value
+        return values[-1][0]
+
+    position = q * (total - 1)
+    lower = math.floor(position)
+    lower_value, upper_value = value_at(lower), value_at(min(lower + 1, total - 1))
+    return lower_value + (upper_value - lower_value) * (position - lower)
+
+#%% Summarize
+
+# Summary rows (KEY_COLUMNS + VALUE_COLUMNS) for raw rows of a source table
+def summarize(source, rows):
+    spec = SUMMARY_SOURCES[source]
+    if rows.empty:
+        return pd.DataFrame(columns=KEY_COLUMNS + VALUE_COLUMNS)
+
+    keys = pd.DataFrame({
+        "source": source,
+        "player": rows[spec["player"]].map(lambda value: player_key(value) if pd.notna(value) else None),
+        "day": pd.to_datetime(rows[spec["date"]]).dt.strftime('%Y-%m-%d'),
+    }, index=rows.index)
+    for column in ("pitch_type", "intent_type"):
+        table_column = spec["groups"].get(column)
+        values = rows[table_column].astype(object) if table_column else pd.Series("", index=rows.index)
+        if column == "intent_type" and table_column:
+            values = values.map(intent_name)
+        keys[column] = values.fillna("")
+    keys = keys[keys["player"].notna() & keys["day"].notna()]
+    group = KEY_COLUMNS[:-1]
+
+    parts = [keys.groupby(group).size().rename("n").reset_index().assign(metric=ROWS)]
+    for metric in spec["metrics"]:
+        values = pd.to_numeric(rows.loc[keys.index, metric], errors='coerce').astype(float)
+        frame = keys.assign(value=values, value_sq=values ** 2, step=(values / SKETCH_STEP).round()).dropna(subset=["value"])
+        if frame.empty:
+            continue
+
+        grouped = frame.groupby(group)
+        part = grouped.agg(n=("value", "count"), total=("value", "sum"), total_sq=("value_sq", "sum"), max=("value", "max"))
+        counts = frame.groupby(group + ["step"]).size()
+        sketches = {}
+        for (*key, step), count in counts.items():
+            sketches.setdefault(tuple(key), {})[f"{step * SKETCH_STEP:.1f}"] = int(count)
+        part["sketch"] = [sketches[key] for key in part.index]
+        parts.append(part.reset_index().assign(metric=metric))
+
+    return pd.concat(parts, ignore_index=True).reindex(columns=KEY_COLUMNS + VALUE_COLUMNS)
+
+# Add up summary rows that share the `by` columns
+def combine(summaries, by):
+    if summaries.empty:
+        return pd.DataFrame(columns=by + VALUE_COLUMNS)
+    grouped = summaries.groupby(by, sort=False)
+    combined = grouped.agg(n=("n", "sum"), total=("total", "sum"), total_sq=("total_sq", "sum"), max=("max", "max"))
+    combined["sketch"] = grouped["sketch"].agg(merge_sketches)
+    return combined.reset_index()
+
+# Wide stats per `by` group: "<metric>_mean", "_std" (sample), "_max", "_90" for every metric and the row count as "rows"
+def summary_stats(summaries, by):
+    combined = combine(summaries, by + ["metric"])
+    stats = pd.DataFrame(combined[by].drop_duplicates())
+    for metric, part in combined.groupby("metric", sort=False):
+        part = part.set_index(by)
+        if metric == ROWS:
+            values = pd.DataFrame({ROWS: part["n"]})
+        else:
+            n = part["n"].astype(float)
+            mean = part["total"] / n
+            variance = ((part["total_sq"] - part["total"] ** 2 / n) / (n - 1)).clip(lower=0).where(n > 1)
+            values = pd.DataFrame({
+                f"{metric}_mean": mean,
+                f"{metric}_std": np.sqrt(variance),
+                f"{metric}_max": part["max"],
+                f"{metric}_90": part["sketch"].map(lambda sketch: sketch_quantile(sketch, 0.9)),
+            })
+        stats = stats.merge(values.reset_index(), on=by, how="left")
+    return stats.reset_index(drop=True)
+
+# Filters for the raw rows of some players (summary player keys) between two days, inclusive
+def raw_filters(source, players, start_str, end_str):
+    spec = SUMMARY_SOURCES[source]
+    # Rapsodo ids are stored as numbers; swings player ids as integers
+    filter_players = tuple(int(player) if player.isdigit() else player for player in players)
+    return [('in_', spec["player"], filter_players), ('gte', spec["date"], start_str), ('lte', spec["date"], end_str)]
+
+# A change to a source table seen from another process (changes.py) means its summaries changed too
+def clear_summaries_on_change(table_name):
+    if table_name in SUMMARY_SOURCES:
+        clear_table_cache(SUMMARY_TABLE)
+
+on_table_change(clear_summaries_on_change)
+
+#%% Read
+
+# Summary rows of one source for some players (player_ids, or Rapsodo ids for the Rapsodo tables) between two
+# dates, inclusive. Read from daily_summaries; when it isn't loaded or has nothing for the range, the raw rows
+# are downloaded and summarized here instead, so pages get the same shape either way.
+def fetch_summaries(source, players, start_date, end_date):
+    players = [player_key(player) for player in players if player is not None and pd.notna(player)]
+    if not players:
+        return pd.DataFrame(columns=KEY_COLUMNS + VALUE_COLUMNS)
+    start_str = pd.to_datetime(start_date).strftime('%Y-%m-%d')
+    end_str = pd.to_datetime(end_date).strftime('%Y-%m-%d')
+
+    if source not in _unavailable:
+        try:
+            summaries = fetch_table_query(SUMMARY_TABLE, filters=[
+                ('eq', 'source', source), ('in_', 'player', tuple(players)), ('gte', 'day', start_str), ('lte', 'day', end_str),
+            ])
+            if not summaries.empty:
+                return summaries.reset_index(drop=True)
+        except APIError as error:
+            if error.code not in ("42P01", "PGRST205"):
+                raise
+            _unavailable.add(source)
+
+    rows = fetch_table_query(source, columns=source_columns(source), filters=raw_filters(source, players, start_str, end_str))
+    return summarize(source, rows)
+
+#%% Write
+
+# Fold new summary rows into daily_summaries: the stored rows of the same players and days are read back,
+# added to and upserted. Uploads call this once per file batch; with more than one job worker two uploads
+# for the same player and day could race, which rebuild_summaries repairs. Without daily_summaries loaded
+# nothing is written and False is returned (pages summarize the raw rows then); any other failure is raised,
+# so the upload stops before checkpointing the batch and a retry writes its summaries again.
+def add_summaries(client, summaries):
+    if summaries.empty:
+        return True
+    try:
+        for source, new in combine(summaries, KEY_COLUMNS).groupby("source"):
+            if source in _unavailable:
+                continue
+            stored = (
+                client.table(SUMMARY_TABLE)
+                .select("*")
+                .eq("source", source)
+                .in_("player", sorted(new["player"].unique()))
+                .in_("day", sorted(new["day"].unique()))
+                .execute()
+            )
+            if stored.data:
+                new = combine(pd.concat([pd.DataFrame(stored.data), new], ignore_index=True), KEY_COLUMNS)
+            write_summaries(client, new)
+    except APIError as error:
+        if error.code not in ("42P01", "PGRST205"):
+            raise
+        _unavailable.update(SUMMARY_SOURCES)
+        logger.warning("%s is not loaded; summaries are not kept", SUMMARY_TABLE)
+        return False
+    finally:
+        clear_table_cache(SUMMARY_TABLE)
+    return True
+
+# Summarize the players and days of some raw rows again from the table, replacing their stored summary rows.
+# Uploads use this for a batch an interrupted attempt may already have stored: its rows then come back as
+# already stored and adding only the inserted ones would leave them out. Fails like add_summaries.
+def refresh_summaries(client, source, rows):
+    days = summarize(source, rows)[["player", "day"]].drop_duplicates()
+    if days.empty or source in _unavailable:
+        return True
+    try:
+        stored = download_query(
+            source, columns=source_columns(source),
+            filters=raw_filters(source, days["player"].unique(), days["day"].min(), days["day"].max()), client=client,
+        )
+        write_summaries(client, summarize(source, stored).merge(days, on=["player", "day"]))
+    except APIError as error:
+        if error.code not in ("42P01", "PGRST205"):
+            raise
+        _unavailable.update(SUMMARY_SOURCES)
+        logger.warning("%s is not loaded; summaries are not kept", SUMMARY_TABLE)
+        return False
+    finally:
+        clear_table_cache(SUMMARY_TABLE)
+    return True
+
+def write_summaries(client, summaries):
+    records = summaries.astype(object).where(summaries.notna(), None).to_dict(orient="records")
+    batch_rows = ingest_batch_rows()
+    for start in range(0, len(records), batch_rows):
+        client.table(SUMMARY_TABLE).upsert(records[start:start + batch_rows], on_conflict=",".join(KEY_COLUMNS)).execute()
+
+# Recompute a source's summaries from all of its raw rows: needed once after loading sql/summaries.sql,
+# and after rows are changed outside an upload
+def rebuild_summaries(source, client=None):
+    client = client or get_db().client
+    rows = download_query(source, columns=source_columns(source), client=client)
+    summaries = summarize(source, rows)
+    client.table(SUMMARY_TABLE).delete().eq("source", source).execute()
+    write_summaries(client, summaries)
+    clear_table_cache(SUMMARY_TABLE)
+    _unavailable.discard(source)
+    return len(summaries)
+
+#%% Command Line
+
+# cd app && python -m data_access.summaries rebuild [swings rapsodo_hitting rapsodo_pitching]
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild" or any(source not in SUMMARY_SOURCES for source in sys.argv[2:]):
+        print(f"usage: python -m data_access.summaries rebuild [{' '.join(SUMMARY_SOURCES)}]")
+        sys.exit(1)
+    for source in sys.argv[2:] or SUMMARY_SOURCES:
+        print(f"{source}: {rebuild_summaries(source)} summary rows")
@@ -0,0 +1,374 @@
+#%% Imports
+
+import io
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import pandas as pd
+import streamlit as st
+
+from data_access.cache import SingleFlight, TableCache
+from data_access.changes import on_table_change
+from data_access.connection import get_db
+from data_access.mirror import MIRROR_TABLES, drop_mirror, read_mirror, resync_mirror
+from data_access.schema import apply_schema, csv_read_options
+from data_access.settings import cache_max_bytes, cache_ttl, csv_transfer, fetch_workers, mirror_enabled
+
+#%% Cache Access
+
+# One cache for the whole process, so reruns and other coaches' sessions reuse tables instead of downloading them again
+_table_cache = None
+_table_cache_lock = threading.Lock()
+
+def get_table_cache():
+    global _table_cache
+    with _table_cache_lock:
+        if _table_cache is None:
+            _table_cache = TableCache(ttl=cache_ttl(), max_bytes=cache_max_bytes())
+    return _table_cache
+
+_single_flight = SingleFlight()
+
+# Cached value for key, downloaded once even when several sessions miss it at the same time
+def cached_fetch(key, fetch):
+    value = get_table_cache().get(key)
+    if value is not None:
+        return value
+    return fetch_missing(key, fetch)
+
+# Download and cache a value already looked up and missed, shared with a download of the same key in flight.
+# If the table is cleared while the download runs, the result is returned but not cached.
+def fetch_missing(key, fetch):
+    def fetch_and_store():
+        cache = get_table_cache()
+        generation = cache.generation(key[0])
+        value = fetch()
+        cache.put(key, value, generation)
+        return value
+
+    return _single_flight.do(key, fetch_and_store)
+
+def clear_table_cache(table_name=None):
+    get_table_cache().invalidate(table_name)
+
+# Cache counters plus how many fetches were shared with a request already in flight
+def cache_stats():
+    return {**get_table_cache().stats(), **_single_flight.stats()}
+
+# Changes seen by the watcher in changes.py drop that table's entries, aggregates included
+on_table_change(clear_table_cache)
+
+#%% Data Retrieval
+
+# PostgREST needs quotes around column names with spaces or punctuation, e.g. "HB (trajectory)"
+def quote_column(column):
+    if re.fullmatch(r"[A-Za-z0-9_]+", column):
+        return column
+    return f'"{column}"'
+
+def select_columns(columns):
+    if columns is None:
+        return "*"
+    return ",".join(quote_column(col) for col in columns)
+
+# Columns each table's rows are ordered by. Windows are fetched concurrently by offset, and Postgres only keeps
+# rows in the same order across requests when it is told one, so every query orders by a unique key.
+ROW_ORDER = {
+    "swings": ["uuid"],
+    "daily_summaries": ["source", "player", "day", "pitch_type", "intent_type", "metric"],
+}
+
+def row_order(table_name):
+    return ROW_ORDER.get(table_name, ["id"])
+
+def build_query(client, table_name, columns=None, filters=(), count=None):
+    query = client.table(table_name).select(select_columns(columns), count=count)
+    for operator, column, value in filters:
+        query = getattr(query, operator)(quote_column(column), value)
+    for column in row_order(table_name):
+        query = query.order(quote_column(column))
+    return query
+
+# Download the rows of a table matching filters.
+# filters is a sequence of (operator, column, value) tuples, e.g. ("eq", "player_id", 12) or ("gte", "Date", "2025-01-01")
+# The first window also asks for an exact row count; every remaining .range() window is then requested at once
+# through a thread pool (DP_FETCH_WORKERS) and the pages are put back together in order.
+# CSV_TABLES take the CSV path below unless DP_CSV_TRANSFER=0.
+def download_query(table_name, columns=None, filters=(), batch_size=1000, client=None):
+    # Worker threads have no Streamlit context, so callers running in threads pass the client in
+    if client is None:
+        client = get_db().client
+
+    if table_name in CSV_TABLES and csv_transfer():
+        df = download_query_csv(client, table_name, columns, filters, batch_size)
+        if df is not None:
+            return df
+
+    first = (
+        build_query(client, table_name, columns, filters, count="exact")
+        .range(0, batch_size - 1)
+        .execute()
+    )
+    all_data = list(first.data or [])
+    total = first.count
+
+    # No count back from the server: fall back to walking the windows one at a time
+    if total is None:
+        all_data.extend(download_remaining(client, table_name, columns, filters, batch_size, len(all_data)))
+        return to_frame(all_data, columns)
+
+    # The server may cap responses below batch_size (Supabase max rows); size the windows to what it returned
+    if 0 < len(all_data) < batch_size and total > len(all_data):
+        batch_size = len(all_data)
+
+    def fetch_window(start):
+        response = (
+            build_query(client, table_name, columns, filters)
+            .range(start, start + batch_size - 1)
+            .execute()
+        )
+        return response.data or []
+
+    starts = list(range(len(all_data), total, batch_size))
+    if starts:
+        with ThreadPoolExecutor(max_workers=min(fetch_workers(), len(starts))) as pool:
+            # map hands results back in the order the windows were submitted
+            for batch in pool.map(fetch_window, starts):
+                all_data.extend(batch)
+
+    return to_frame(all_data, columns)
+
+# Wide sensor tables are requested as text/csv and parsed by read_csv straight into typed columns,
+# skipping the list of dicts that pd.DataFrame(response.data) has to walk.
+CSV_TABLES = ("swings", "rapsodo_hitting", "rapsodo_pitching")
+
+# A one-row request gets the exact count, then every window is fetched as CSV at once.
+# Returns None when the JSON path has to be used instead (no count, or the server capped the windows).
+def download_query_csv(client, table_name, columns, filters, batch_size):
+    total = build_query(client, table_name, columns, filters, count="exact").range(0, 0).execute().count
+    if total is None:
+        return None
+    if total == 0:
+        return to_frame([], columns)
+
+    # the response's data is the CSV text (an empty list when the window is empty)
+    def fetch_window(start):
+        return (
+            build_query(client, table_name, columns, filters)
+            .range(start, start + batch_size - 1)
+            .csv()
+            .execute()
+            .data
+        )
+
+    starts = list(range(0, total, batch_size))
+    with ThreadPoolExecutor(max_workers=min(fetch_workers(), len(starts))) as pool:
+        bodies = list(pool.map(fetch_window, starts))
+
+    df = parse_csv_windows(table_name, bodies)
+    if len(df) < total:
+        return None
+
+    if 'id' in df.columns:
+        df.set_index('id', inplace=True)
+    elif 'uuid' in df.columns:
+        df.set_index('uuid', inplace=True)
+    return df
+
+# Every window repeats the header line; keep the first one and parse all windows in a single read_csv
+def parse_csv_windows(table_name, bodies):
+    bodies = [body for body in bodies if isinstance(body, str) and body.strip()]
+    if not bodies:
+        return pd.DataFrame()
+
+    header = bodies[0].split("\n", 1)[0]
+    parts = [bodies[0].rstrip("\n")]
+    for body in bodies[1:]:
+        rows = body.split("\n", 1)[1] if "\n" in body else ""
+        if rows.strip():
+            parts.append(rows.rstrip("\n"))
+
+    columns = pd.read_csv(io.StringIO(header), nrows=0).columns
+    text = "\n".join(parts)
+    options = csv_read_options(table_name, columns)
+    try:
+        return pd.read_csv(io.StringIO(text), **options)
+    except ValueError:
+        # text other than "-" in a metric column: read the metric columns as text and turn what isn't a number into NaN
+        metrics = options.pop("dtype")
+        df = pd.read_csv(io.StringIO(text), **options)
+        for column, dtype in metrics.items():
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        return df
+
+# Sequential pagination, stopping at the first short batch
+def download_remaining(client, table_name, columns, filters, batch_size, start):
+    all_data = []
+
+    # A short first batch means there is nothing left
+    if start < batch_size:
+        return all_data
+
+    while True:
+        response = (
+            build_query(client, table_name, columns, filters)
+            .range(start, start + batch_size - 1)
+            .execute()
+        )
+
+        batch = response.data
+
+        if not batch:
+            break
+
+        all_data.extend(batch)
+
+        # Move to next batch
+        start += batch_size
+
+        # Stop if last batch was smaller than batch_size
+        if len(batch) < batch_size:
+            break
+
+    return all_data
+
+def download_table(table_name, batch_size=1000, client=None):
+    if client is None:
+        client = get_db().client
+
+    # Append-only sensor tables are read from the local mirror after pulling just the new rows
+    if table_name in MIRROR_TABLES and mirror_enabled():
+        df = read_mirror(table_name, partial(download_query, client=client))
+    else:
+        df = download_query(table_name, batch_size=batch_size, client=client)
+    return apply_schema(table_name, df)
+
+# Rebuild a table's local mirror from scratch (e.g. after editing existing rows on the server)
+def resync_table_mirror(table_name):
+    resync_mirror(table_name, download_query)
+    clear_table_cache(table_name)
+
+# Same, left to the next read of the table (by this process or any other using the same DP_MIRROR_PATH)
+def drop_table_mirror(table_name):
+    drop_mirror(table_name)
+    clear_table_cache(table_name)
+
+# Normalize rows into a DataFrame indexed by 'id' if it exists, otherwise 'uuid'
+def to_frame(rows, columns=None):
+    # Keep the projected columns on empty results so page code can still reference them
+    if not rows and columns is not None:
+        return pd.DataFrame(columns=list(columns))
+
+    df = pd.DataFrame(rows)
+    if 'id' in df.columns:
+        df.set_index('id', inplace=True)
+    elif 'uuid' in df.columns:
+        df.set_index('uuid', inplace=True)
+    return df
+
+# Function to fetch data from any table, served from the process-wide table cache when fresh
+def fetch_table_data(table_name, batch_size=1000):
+    df = cached_fetch((table_name,), lambda: download_table(table_name, batch_size))
+
+    if df.empty:
+        st.warning(f"No data returned from table '{table_name}'.")
+        return pd.DataFrame()
+
+    # Pages adjust columns in place; a shallow copy is enough since copy-on-write (cache.py) protects the cached frame
+    return df.copy(deep=False)
+
+# Page bootstrap: a page declares every table it needs and they are all downloaded at once,
+# so startup waits on the slowest table instead of the sum of all of them.
+# Returns {table_name: DataFrame}; seconds spent per table are kept for last_load_times().
+def load_tables(table_names, batch_size=1000):
+    cache = get_table_cache()
+    client = get_db().client
+    frames = {}
+    load_times = {}
+
+    missing = []
+    for table_name in table_names:
+        df = cache.get((table_name,))
+        if df is None:
+            missing.append(table_name)
+        else:
+            frames[table_name] = df
+            load_times[table_name] = 0.0
+
+    def timed_download(table_name):
+        started = time.perf_counter()
+        df = fetch_missing((table_name,), lambda: download_table(table_name, batch_size, client))
+        return df, time.perf_counter() - started
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            for table_name, (df, seconds) in zip(missing, pool.map(timed_download, missing)):
+                frames[table_name] = df
+                load_times[table_name] = seconds
+
+    st.session_state["table_load_times"] = load_times
+
+    tables = {}
+    for table_name in table_names:
+        df = frames[table_name]
+        if df.empty:
+            st.warning(f"No data returned from table '{table_name}'.")
+            tables[table_name] = pd.DataFrame()
+        else:
+            tables[table_name] = df.copy(deep=False)
+    return tables
+
+# Seconds each table took in the page's last load_tables call (0.0 = served from cache)
+def last_load_times():
+    return st.session_state.get("table_load_times", {})
+
+# Query mode: only the rows and columns a page displays are sent by the server.
+# An empty result is normal here (e.g. a player with no swings), so no warning is shown.
+def fetch_table_query(table_name, columns=None, filters=(), batch_size=1000):
+    filters = tuple(tuple(f) for f in filters)
+    key = (table_name, tuple(columns) if columns is not None else None, filters)
+
+    df = cached_fetch(key, lambda: apply_schema(table_name, download_query(table_name, columns, filters, batch_size)))
+
+    return df.copy(deep=False)
+
+#%% Data Writes
+
+# Writes made through the app go through these so the cached table is refreshed next read
+def insert_rows(table_name, rows):
+    response = get_db().client.table(table_name).insert(rows).execute()
+    clear_table_cache(table_name)
+    return response
+
+# One request for many rows: rows matching on_conflict are updated, the rest inserted.
+# PostgREST needs every row to carry the same keys.
+def upsert_rows(table_name, rows, on_conflict="id", ignore_duplicates=False):
+    response = (
+        get_db().client
+        .table(table_name)
+        .upsert(rows, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates)
+        .execute()
+    )
+    clear_table_cache(table_name)
+    return response
+
+def update_rows(table_name, values, match_column, match_value):
+    response = (
+        get_db().client
+        .table(table_name)
+        .update(values)
+        .eq(match_column, match_value)
+        .execute()
+    )
+    clear_table_cache(table_name)
+    return response
+
+# Rows of an edited frame (e.g. from st.data_editor) where any cell differs from the loaded frame.
+# Cells are compared as objects so categorical columns with different categories and NaN/None both count as equal.
+def diff_rows(original, edited):
+    before = original.reindex(index=edited.index, columns=edited.columns).astype(object)
+    after = edited.astype(object)
+    same = (before == after) | (before.isna() & after.isna())
+    return edited[~same.all(axis=1)]
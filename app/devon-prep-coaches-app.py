@@ -4,7 +4,8 @@ import pandas as pd
 import streamlit as st
 import sys, shutil, pathlib
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import get_identity, io_debug_panel, start_background_jobs, start_io_log, write_io_log
+from data_access.settings import admin_emails
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -23,37 +24,20 @@ for p in pathlib.Path(".").rglob("__pycache__"):
 
 #%% set user session state
 
+# every table and storage call made during this rerun is timed into a fresh I/O log
+start_io_log()
+
+# queued uploads run on this process's job workers (started once)
+start_background_jobs()
+
 if "user" not in st.session_state:
     st.session_state["user"] = {}
 
 
-#%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
-
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
-# Fetch data from all tables, then align id to supabase index
-users = fetch_table_data('users')
+# Users resolve by email through the identity index (data_access/identity.py)
+identity = get_identity()
 
 #%% Run the App
 st.set_page_config(layout="wide",page_title="Devon Prep Baseball",page_icon=r'app/images/dp_logo_transparent.png')
@@ -77,10 +61,10 @@ with st.sidebar:
 
 if st.user.is_logged_in:
     current_user_email = st.user.email
-    if not users['email'].isin([st.user.email]).any():
+    current_user_type = identity.user_type(current_user_email)
+    if current_user_type is None:
         st.write("You do not have access to this app. Please contact your coach.")
     else:
-        current_user_type = users.loc[users['email'] == current_user_email, 'type'].iloc[0]
         if current_user_type == "Player":
             #%% page definitions
             player_page = st.Page("pages/player-page.py",title="Player Summary",icon=":material/bar_chart:")
@@ -112,5 +96,12 @@ if st.user.is_logged_in:
                 glossary,
                 gc_parser
             ])
-            nav.run()
+            try:
+                nav.run()
+            finally:
+                write_io_log(page=nav.title, user=current_user_email)
+
+            # per-rerun I/O breakdown for admins
+            if current_user_type == "Admin" or current_user_email.lower() in admin_emails():
+                io_debug_panel()
 else: ""
\ No newline at end of file
@@ -1,7 +1,7 @@
 #%% Imports
 
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import fetch_table_data
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -17,31 +17,8 @@ sys.path.append('..')
 
 st.set_page_config(page_title="Data Glossary", page_icon=r"app/images/dp_logo_transparent.png", layout="wide")
 
-#%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
-
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
 # Fetch data from all tables, then align id to supabase index
 glossary = fetch_table_data('glossary')
 
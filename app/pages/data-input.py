@@ -7,156 +7,103 @@ from datetime import date, time
 import math
 from decimal import Decimal
 import os
-from st_supabase_connection import SupabaseConnection
+from data_access import load_tables, get_roster, FILE_TYPES, detect_file_type, enqueue_upload, list_jobs, read_header, retry_job
 
 
-#%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
-
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
 # Fetch data from all tables, then align id to supabase index
-players = fetch_table_data('players')
-rapsodo_hitting = fetch_table_data('rapsodo_hitting')
-rapsodo_pitching = fetch_table_data('rapsodo_pitching')
-swings = fetch_table_data('swings')
-dk_curves = fetch_table_data('dk_curves')
+# (uploads never download the sensor tables; stored rows are skipped by the database, see data_access/ingest.py)
+tables = load_tables(['players'])
+players = tables['players']
 
 #%% Data Adjustments
 
-# assign class levels to index of years
-classdict = {
-        0: "Grad",
-        1: "Senior",
-        2: "Junior",
-        3: "Sophomore",
-        4: "Freshman",
-        5: "Middle"
-}
-
-# create the display version of players
-players_show = players.copy()
-
-# assign class year names to each player based on graduation year
-def classdef(df):
-    class_years = []
-    for grad_year in df['grad_year']:
-        if isinstance(grad_year, Decimal):
-            grad_year = int(grad_year)
-        # Calculate difference in years between grad date and today
-        years_diff = math.ceil((date(grad_year, 9, 1) - date.today()).days / 365)
-        # Cap within 0–5
-        if years_diff >= 5:
-            years_diff = 5
-        elif years_diff < 1:
-            years_diff = 0
-        # Look up label from classdict
-        class_year = classdict.get(years_diff, "Unknown")
-        class_years.append(class_year)
-    # Assign back to the DataFrame
-    df['class'] = class_years
-
-# Run the function on your display DataFrame
-classdef(players_show)
-
-# Create Players Full Name Column
-players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
-
-# assign player active status by class
-active_classes = ['Freshman','Sophomore','Junior','Senior']
-players_show['active'] = players_show['class'].isin(active_classes)
-
-# create currentplayers table
-currentplayers = players_show.query('active == True')
-
-# Prepare dropdown options
-player_options = players_show['full_name'].to_dict()
+roster = get_roster()
+players_show = roster['players_show']
+currentplayers = roster['currentplayers']
+player_options = roster['player_options']
 
 #%% .csv Data Dump
 
 st.title("Data Input")
-new_file = st.file_uploader("Dump Diamond Kinetics .csv File, or Rapsodo 'pitchinggroup' or 'hittinggroup' File Here",type="csv")
-
-if new_file is not None:
-    file_df=pd.read_csv(new_file)
-    file_df.replace("-", None, inplace=True)
-    file_cols = file_df.columns
-    # Determine file type
-    if "Pitch ID" in file_cols:
-        file_type = "rapsodo_pitching"
-    elif "HitID" in file_cols:
-        file_type = "rapsodo_hitting"
-    elif "user.battingOrientation" in file_cols:
-        file_type = "dk_hitting"
-        cols = [
-            "uuid","created_date","created_datetime","swing_power","max_acceleration",
-            "impact_momentum","max_hand_speed","max_barrel_speed","speed_efficiency",
-            "trigger_to_impact","attack_angle","hand_cast","distance_in_zone",
-            "sensor_time_sec","vertical_angle","barrel_x","barrel_y","barrel_z",
-            "exit_velocity","potential_distance","player_id","bat_length"
-        ]
-        file_df = file_df.copy()
-        file_df = file_df.iloc[3:, 15:]
-        file_df = file_df.drop(columns=["swing.sensorDateTime"])
-        file_df.columns = cols
-        file_df.reset_index(drop=True, inplace=True)
-    else:
-        file_type = None
-        st.error("Unrecognized file type.")
-
-    # Standardize Date column if it exists
-    if "Date" in file_cols:
-        file_df['Date'] = pd.to_datetime(file_df['Date']).dt.strftime('%Y-%m-%d')
-
-    # Upload button
+new_files = st.file_uploader("Dump Diamond Kinetics .csv Files, or Rapsodo 'pitchinggroup' or 'hittinggroup' Files Here",type="csv",accept_multiple_files=True)
+
+if new_files:
+    # Determine each file's type from its header; the files are parsed in parallel while uploading
+    file_types = [detect_file_type(read_header(new_file)) for new_file in new_files]
+    st.dataframe(pd.DataFrame({
+        "File": [new_file.name for new_file in new_files],
+        "Type": [FILE_TYPES[file_type]["label"] if file_type else "Unrecognized" for file_type in file_types],
+    }), hide_index=True)
+    if None in file_types:
+        st.error("Unrecognized files are skipped.")
+
+    # files uploaded before are recognized by their content and skipped, unless sent again on purpose
+    force = st.checkbox("Upload files again even if they were uploaded before", value=False)
+
+    # Upload button: the files are queued as a background job, which keeps running if this tab is closed
     upload = st.button("Upload Data")
-    if upload and file_type:
-        if file_type == "rapsodo_pitching":
-            pitch_upload = file_df[~file_df['Pitch ID'].isin(rapsodo_pitching['Pitch ID'])]
-            if len(pitch_upload) == 0:
-                st.success("Rapsodo Pitching Data is Up To Date")
-            else:
-                pitch_upload = pitch_upload.to_dict(orient="records")
-                response = db.table("rapsodo_pitching").insert(pitch_upload).execute()
-                st.session_state.form_submitted = True
-                st.success("Rapsodo Pitching Data Successfully Uploaded")
-
-        elif file_type == "rapsodo_hitting":
-            hit_upload = file_df[~file_df['HitID'].isin(rapsodo_hitting['HitID'])]
-            if len(hit_upload) == 0:
-                st.success("Rapsodo Hitting Data is Up To Date")
-            else:
-                hit_upload = hit_upload.to_dict(orient="records")
-                response = db.table("rapsodo_hitting").insert(hit_upload).execute()
-                st.session_state.form_submitted = True
-                st.success("Rapsodo Hitting Data Successfully Uploaded")
-
-        elif file_type == "dk_hitting":
-            dk_upload = file_df[~file_df['uuid'].isin(swings.index)]
-            if len(dk_upload) == 0:
-                st.success("Diamond Kinetics Hitting Data is Up To Date")
-            dk_upload = dk_upload.replace({np.nan: None})
-            records = dk_upload.to_dict(orient="records")
-            response = db.table("swings").insert(records).execute()
-            st.session_state.form_submitted = True
-            st.success("Diamond Kinetics Data Successfully Uploaded")
\ No newline at end of file
+    if upload and any(file_types):
+        user = st.user.email if st.user.is_logged_in else None
+        job_id = enqueue_upload(new_files, user=user, force=force)
+        st.success(f"Upload queued as job #{job_id}. Progress is shown below.")
+
+#%% Upload Jobs
+
+st.subheader("Upload Jobs", divider="yellow")
+
+def uploads_active(jobs):
+    return any(job["status"] in ("queued", "running") for job in jobs)
+
+polling = uploads_active(list_jobs(kind="upload", limit=20))
+
+# refreshes every 5 seconds while jobs are queued or running, without rerunning the page; once they have all
+# finished the page reruns, which stops the polling
+@st.fragment(run_every=5 if polling else None)
+def upload_jobs():
+    jobs = list_jobs(kind="upload", limit=20)
+    if polling and not uploads_active(jobs):
+        st.rerun()
+    if not jobs:
+        st.write("No uploads yet.")
+        return
+
+    st.dataframe(pd.DataFrame([{
+        "Job": job["id"],
+        "Status": job["status"].title(),
+        "Progress": job["progress"],
+        "Files": ", ".join(upload["name"] for upload in job["payload"]["files"]),
+        "New Rows": sum(result["inserted"] for result in job["result"] or []),
+        "Queued": pd.Timestamp.fromtimestamp(job["created_at"]).strftime("%m/%d %I:%M %p"),
+        "By": job["created_by"],
+        "Error": job["error"],
+    } for job in jobs]), column_config={"Progress": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0)}, hide_index=True)
+
+    # one line per file: rows read, repeated in another file (or earlier in the same one), new, already stored
+    job_ids = [job["id"] for job in jobs if job["result"]]
+    if job_ids:
+        job_id = st.selectbox("File Results for Job", job_ids)
+        results = next(job["result"] for job in jobs if job["id"] == job_id)
+        st.dataframe(pd.DataFrame([{
+            "File": result["name"],
+            "Type": result["label"],
+            "Rows": result["read"],
+            "Duplicates": result["duplicates"],
+            "New Rows": result["inserted"],
+            "Already Stored": result["skipped"],
+            "Uploaded Before": result.get("repeat", False),
+            "Error": result["error"],
+        } for result in results]), hide_index=True)
+
+    failed = [job["id"] for job in jobs if job["status"] == "failed"]
+    if failed:
+        retry_col, button_col = st.columns([3, 1], vertical_alignment="bottom")
+        with retry_col:
+            job_id = st.selectbox("Failed Job", failed)
+        with button_col:
+            if st.button("Retry"):
+                retry_job(job_id)
+                st.rerun()
+
+upload_jobs()
@@ -1,7 +1,7 @@
 #%% Imports
 
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import load_tables, insert_rows, get_roster
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -11,85 +11,20 @@ import os
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
-#%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
-
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
 # Fetch data from all tables, then align id to supabase index
-players = fetch_table_data('players')
-dk_sessions = fetch_table_data('dk_sessions')
+tables = load_tables(['players', 'dk_sessions'])
+players = tables['players']
+dk_sessions = tables['dk_sessions']
 
 #%% Data Adjustments
 
-# assign class levels to index of years
-classdict = {
-        0: "Grad",
-        1: "Senior",
-        2: "Junior",
-        3: "Sophomore",
-        4: "Freshman",
-        5: "Middle"
-}
-
-# create the display version of players
-players_show = players.copy()
-
-# assign class year names to each player based on graduation year
-def classdef(df):
-    class_years = []
-    for grad_year in df['grad_year']:
-        if isinstance(grad_year, Decimal):
-            grad_year = int(grad_year)
-        # Calculate difference in years between grad date and today
-        years_diff = math.ceil((date(grad_year, 9, 1) - date.today()).days / 365)
-        # Cap within 0–5
-        if years_diff >= 5:
-            years_diff = 5
-        elif years_diff < 1:
-            years_diff = 0
-        # Look up label from classdict
-        class_year = classdict.get(years_diff, "Unknown")
-        class_years.append(class_year)
-    # Assign back to the DataFrame
-    df['class'] = class_years
-
-# Run the function on your display DataFrame
-classdef(players_show)
-
-# Create Players Full Name Column
-players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
-
-# assign player active status by class
-active_classes = ['Freshman','Sophomore','Junior','Senior']
-players_show['active'] = players_show['class'].isin(active_classes)
-
-# create currentplayers table
-currentplayers = players_show.query('active == True')
-
-# Prepare dropdown options
-player_options = players_show['full_name'].to_dict()
-active_player_options = currentplayers['full_name'].to_dict()
+roster = get_roster()
+players_show = roster['players_show']
+currentplayers = roster['currentplayers']
+player_options = roster['player_options']
+active_player_options = roster['active_player_options']
 
 
 #%% Get recent data from table
@@ -132,6 +67,6 @@ if submit:
         }
     for swing_num in range(start_swing, end_swing + 1)
     ]
-    response = db.client.table("dk_sessions").insert(new_rows).execute()
+    response = insert_rows("dk_sessions", new_rows)
     st.success(f"Inserted swings {start_swing}–{end_swing}")
     st.rerun()
@@ -1,7 +1,7 @@
 #%% Imports
 
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import load_tables, insert_rows, get_roster, get_identity
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -12,86 +12,21 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import re as re
 
-#%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
-
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
 # Fetch data from all tables
-players = fetch_table_data('players')
-games = fetch_table_data('games')
-plate_appearances = fetch_table_data('plate_appearances')
+tables = load_tables(['players', 'games', 'plate_appearances'])
+players = tables['players']
+games = tables['games']
+plate_appearances = tables['plate_appearances']
 
 #%% Data Adjustments
 
-# assign class levels to index of years
-classdict = {
-        0: "Grad",
-        1: "Senior",
-        2: "Junior",
-        3: "Sophomore",
-        4: "Freshman",
-        5: "Middle"
-}
-
-# create the display version of players
-players_show = players.copy()
-
-# assign class year names to each player based on graduation year
-def classdef(df):
-    class_years = []
-    for grad_year in df['grad_year']:
-        if isinstance(grad_year, Decimal):
-            grad_year = int(grad_year)
-        # Calculate difference in years between grad date and today
-        years_diff = math.ceil((date(grad_year, 9, 1) - date.today()).days / 365)
-        # Cap within 0–5
-        if years_diff >= 5:
-            years_diff = 5
-        elif years_diff < 1:
-            years_diff = 0
-        # Look up label from classdict
-        class_year = classdict.get(years_diff, "Unknown")
-        class_years.append(class_year)
-    # Assign back to the DataFrame
-    df['class'] = class_years
-
-# Run the function on your display DataFrame
-classdef(players_show)
-
-# Create Players Full Name Column
-players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
-
-# assign player active status by class
-active_classes = ['Freshman','Sophomore','Junior','Senior']
-players_show['active'] = players_show['class'].isin(active_classes)
-
-# create currentplayers table
-currentplayers = players_show.query('active == True')
-
-# Prepare dropdown options
-player_options = players_show['full_name'].to_dict()
-active_player_options = currentplayers['full_name'].to_dict()
+roster = get_roster()
+players_show = roster['players_show']
+currentplayers = roster['currentplayers']
+player_options = roster['player_options']
+active_player_options = roster['active_player_options']
 
 #%% Testing
 
@@ -102,7 +37,8 @@ devon_teams = ['Varsity','Junior Varsity','Freshman']
 dp_team_abbrev = 'DVNP'
 innings_sequence = ['Top 1st', 'Bottom 1st', 'Top 2nd', 'Bottom 2nd', 'Top 3rd', 'Bottom 3rd', 'Top 4th', 'Bottom 4th', 'Top 5th', 'Bottom 5th', 'Top 6th', 'Bottom 6th', 'Top 7th', 'Bottom 7th', 'Top 8th', 'Bottom 8th', 'Top 9th', 'Bottom 9th', 'Top 10th', 'Bottom 10th', 'Top 11th', 'Bottom 11th', 'Top 12th', 'Bottom 12th', 'Top 13th', 'Bottom 13th']
 search_cols = ['gc_name_with_number_1','gc_name_with_number_2','gc_name_with_number_3','gc_name_full_1','gc_name_full_2','gc_name_full_3','gc_name_initial_1','gc_name_initial_2','gc_name_initial_3']
-# THIS NEEDS FIXING # long_players_and_gc_names = players.melt(id_vars='id',value_vars=search_cols,value_name='gc_match')
+# GC names resolve to player ids through the identity index (search_cols are its GC_NAME_COLUMNS)
+identity = get_identity()
 
 txtfile = st.file_uploader("Dump GC Text File Here", accept_multiple_files=False)
 if txtfile == '':
@@ -161,7 +97,7 @@ if txtfile == '':
                 'opponent_name': other_team_name,
                 'venue': venue,
             }
-            response = db.client.table("games").insert(new_game).execute()
+            response = insert_rows("games", new_game)
             game_id = response.select()
             parsed_pas = []
             parsed_pitches = []
@@ -185,15 +121,13 @@ if txtfile == '':
                 if row['is_outcome_string']:
                     if row['text'] != "Half-inning ended by out on the base paths.":                    
                         batter_match_text = None #ADD RESULTS STRING HERE
-                        batter_matches = long_players_and_gc_names.loc[long_players_and_gc_names['gc_match']==batter_match_text,'id']
-                        batter_match_id = batter_matches.iloc[0] if not batter_matches.empty else None
+                        batter_match_id = identity.player_for_gc_name(batter_match_text)
                         if batter_match_id == None:
                             batter_handedness = None
                         else:
                             batter_handedness = players.loc[players['id']==batter_match_id,'bats']
                         pitcher_match_text = None #ADD RESULTS STRING HERE
-                        pitcher_matches = long_players_and_gc_names.loc[long_players_and_gc_names['gc_match']==pitcher_match_text,'id']
-                        pitcher_match_id = pitcher_matches.iloc[0] if not pitcher_matches.empty else None
+                        pitcher_match_id = identity.player_for_gc_name(pitcher_match_text)
                         if pitcher_match_id == None:
                             pitcher_handedness = None
                         else:
@@ -1,7 +1,7 @@
 #%% Imports
 
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import get_db, load_tables, get_roster, get_identity
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -12,92 +12,27 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
 #%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
+db = get_db()
 
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
 # Fetch data from all tables, then align id to supabase index
-players = fetch_table_data('players')
-users = fetch_table_data('users')
-rapsodo_hitting = fetch_table_data('rapsodo_hitting')
-rapsodo_pitching = fetch_table_data('rapsodo_pitching')
-swings = fetch_table_data('swings')
-goals = fetch_table_data('goals')
+tables = load_tables(['players', 'goals'])
+players = tables['players']
+goals = tables['goals']
 
-# Assign user variables from users table
+# Assign user variables through the identity index (data_access/identity.py)
 
 current_user_email = st.user.email
-current_user_type = users.loc[users['email'] == current_user_email, 'type'].iloc[0]
+identity = get_identity()
+current_user_type = identity.user_type(current_user_email)
 
 #%% Data Adjustments
 
-# assign class levels to index of years
-classdict = {
-        0: "Grad",
-        1: "Senior",
-        2: "Junior",
-        3: "Sophomore",
-        4: "Freshman",
-        5: "Middle"
-}
-
-# create the display version of players
-players_show = players.copy()
-
-# assign class year names to each player based on graduation year
-def classdef(df):
-    class_years = []
-    for grad_year in df['grad_year']:
-        if isinstance(grad_year, Decimal):
-            grad_year = int(grad_year)
-        # Calculate difference in years between grad date and today
-        years_diff = math.ceil((date(grad_year, 9, 1) - date.today()).days / 365)
-        # Cap within 0–5
-        if years_diff >= 5:
-            years_diff = 5
-        elif years_diff < 1:
-            years_diff = 0
-        # Look up label from classdict
-        class_year = classdict.get(years_diff, "Unknown")
-        class_years.append(class_year)
-    # Assign back to the DataFrame
-    df['class'] = class_years
-
-# Run the function on your display DataFrame
-classdef(players_show)
-
-# Create Players Full Name Column
-players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
-
-# assign player active status by class
-active_classes = ['Freshman','Sophomore','Junior','Senior']
-players_show['active'] = players_show['class'].isin(active_classes)
-
-# create currentplayers table
-currentplayers = players_show.query('active == True')
-
-# Prepare dropdown options
-player_options = players_show['full_name'].to_dict()
+roster = get_roster()
+players_show = roster['players_show']
+currentplayers = roster['currentplayers']
+player_options = roster['player_options']
 
 #%% Home Page
  
@@ -110,8 +45,8 @@ active_players = players_show[players_show['active'] == True]
 player_options = dict(zip(active_players.index, active_players['full_name']))
 
 if current_user_type == "Player":
-    player_select = users.loc[users['email'] == current_user_email, 'player_id'].iloc[0]
-    st.markdown(f"Showing player data for ***{players.loc[players['id'] == player_select, 'full_name'].iloc[0]}***")
+    player_select = identity.player_for_email(current_user_email)
+    st.markdown(f"Showing player data for ***{identity.full_name(player_select)}***")
 else:
     player_select = st.selectbox(
         "Player",
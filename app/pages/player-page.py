@@ -1,7 +1,7 @@
 #%% Imports
 
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import load_tables, fetch_table_query, fetch_summaries, summary_stats, get_roster, get_identity
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -14,114 +14,25 @@ from matplotlib.ticker import MultipleLocator
 from matplotlib.patches import Ellipse
 from dateutil.relativedelta import relativedelta
 
-#%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
-
 #%% Data Retrieval
 
-def fetch_table_data(table_name, batch_size=1000):
-    all_data = []
-    start = 0
-
-    while True:
-        response = (
-            db.client
-            .table(table_name)
-            .select("*")
-            .range(start, start + batch_size - 1)
-            .execute()
-        )
-
-        batch = response.data
-
-        if not batch:
-            break
-
-        all_data.extend(batch)
-
-        # Move to next batch
-        start += batch_size
-
-        # Stop if last batch was smaller than batch_size
-        if len(batch) < batch_size:
-            break
-
-    if not all_data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    df = pd.DataFrame(all_data)
-
-    # Set index
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-
-    return df
-
 # Fetch data from all tables, then align id to supabase index
-players = fetch_table_data('players')
-rapsodo_hitting = fetch_table_data('rapsodo_hitting')
-rapsodo_pitching = fetch_table_data('rapsodo_pitching')
-swings = fetch_table_data('swings')
-dk_curves = fetch_table_data('dk_curves')
-video = fetch_table_data('video')
-users = fetch_table_data('users')
+# (swing/rapsodo daily summaries and video are fetched for the selected player and dates further down)
+tables = load_tables(['players', 'dk_curves'])
+players = tables['players']
+dk_curves = tables['dk_curves']
 
 #%% Data Adjustments
 
-# assign class levels to index of years
-classdict = {
-        0: "Grad",
-        1: "Senior",
-        2: "Junior",
-        3: "Sophomore",
-        4: "Freshman",
-        5: "Middle"
-}
-
-# create the display version of players
-players_show = players.copy()
-
-# assign class year names to each player based on graduation year
-def classdef(df):
-    class_years = []
-    for grad_year in df['grad_year']:
-        if isinstance(grad_year, Decimal):
-            grad_year = int(grad_year)
-        # Calculate difference in years between grad date and today
-        years_diff = math.ceil((date(grad_year, 9, 1) - date.today()).days / 365)
-        # Cap within 0–5
-        if years_diff >= 5:
-            years_diff = 5
-        elif years_diff < 1:
-            years_diff = 0
-        # Look up label from classdict
-        class_year = classdict.get(years_diff, "Unknown")
-        class_years.append(class_year)
-    # Assign back to the DataFrame
-    df['class'] = class_years
-
-# Run the function on your display DataFrame
-classdef(players_show)
-
-# Create Players Full Name Column
-players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
-
-# assign player active status by class
-active_classes = ['Freshman','Sophomore','Junior','Senior']
-players_show['active'] = players_show['class'].isin(active_classes)
-
-# create currentplayers table
-currentplayers = players_show.query('active == True')
-
-# Prepare dropdown options
-player_options = players_show['full_name'].to_dict()
+roster = get_roster()
+players_show = roster['players_show']
+currentplayers = roster['currentplayers']
+player_options = roster['player_options']
 
 #%% User Stuff
 current_user_email = st.user.email
-current_user_type = users.loc[users['email'] == current_user_email, 'type'].iloc[0]
+identity = get_identity()
+current_user_type = identity.user_type(current_user_email)
 
 #%% Player Page
 exclude_low_intent=False
@@ -136,8 +47,8 @@ with playerselectcol:
     player_options = dict(zip(active_players.index, active_players['full_name']))
 
     if current_user_type == "Player":
-        player_select = users.loc[users['email'] == current_user_email, 'player_id'].iloc[0]
-        st.markdown(f"Showing player data for ***{players.loc[players['id'] == player_select, 'full_name'].iloc[0]}***")
+        player_select = identity.player_for_email(current_user_email)
+        st.markdown(f"Showing player data for ***{identity.full_name(player_select)}***")
     else:
         player_select = st.selectbox(
             "Player",
@@ -161,17 +72,33 @@ with dateselectcol:
         start_date = pd.to_datetime(dates_select[0])
         end_date = pd.to_datetime(dates_select[1])
 
-#%% Prepare DK Stats
+#%% Player Data Retrieval
+
+# Only the selected player's daily summaries in the date range are downloaded (data_access/summaries.py);
+# counts, means, stds and percentiles below are combined from them instead of the raw swings and pitches
+player_rapsodo_id = identity.rapsodo_id(player_select)
+
+swing_summaries = fetch_summaries('swings', [player_select], start_date, end_date)
+
+video = fetch_table_query(
+    'video',
+    columns=['player_id', 'type', 'date', 'view', 'pitch_type', 'url'],
+    filters=[('eq', 'player_id', player_select)]
+)
+
+# players without a rapsodo id have no rapsodo rows to fetch
+rapsodo_players = [] if player_rapsodo_id is None else [player_rapsodo_id]
+hitting_summaries = fetch_summaries('rapsodo_hitting', rapsodo_players, start_date, end_date)
+pitching_summaries = fetch_summaries('rapsodo_pitching', rapsodo_players, start_date, end_date)
 
-# merge players onto DK data and filter dates
-swings['created_date'] = pd.to_datetime(swings['created_date'], errors='coerce')
+# rows behind a set of summaries ("rows" counts every swing/pitch, a metric name counts its non-empty values)
+def summary_count(summaries, metric='rows'):
+    return int(summaries.loc[summaries['metric'] == metric, 'n'].sum())
 
-dkhit = swings.merge(players_reset,left_on='player_id', right_on='id', how='left')
-player_dkhit = dkhit[dkhit['player_id']==player_select]
-player_dkhit = player_dkhit[
-    (player_dkhit['created_date'] >= pd.to_datetime(start_date)) & 
-    (player_dkhit['created_date'] <= pd.to_datetime(end_date))
-]
+#%% Prepare DK Stats
+
+# swings of the player in the date range
+dk_swing_count = summary_count(swing_summaries)
 
 # prep percentile data
 player_class = players_reset[players_reset['id']==player_select]['class'].iloc[0]
@@ -196,18 +123,19 @@ def get_percentile(value, curve_row):
             return round(interp, 1)
     return None
 
-if len(player_dkhit) > 0:
+if dk_swing_count > 0:
     # Define individual statistics and create dk_df for player page
-    hand_speed_avg = round(pd.to_numeric(player_dkhit['max_hand_speed'], errors='coerce').mean(), 1)
-    barrel_speed_avg = round(pd.to_numeric(player_dkhit['max_barrel_speed'], errors='coerce').mean(), 1)
-    impact_momentum_avg = round(pd.to_numeric(player_dkhit['impact_momentum'], errors='coerce').mean(), 1)
-    attack_angle_avg = round(pd.to_numeric(player_dkhit['attack_angle'], errors='coerce').mean(), 1)
-    trigger_to_impact_avg = round(pd.to_numeric(player_dkhit['trigger_to_impact'], errors='coerce').mean(), 1)
-    hand_speed_std = round(pd.to_numeric(player_dkhit['max_hand_speed'], errors='coerce').std(), 1)
-    barrel_speed_std = round(pd.to_numeric(player_dkhit['max_barrel_speed'], errors='coerce').std(), 1)
-    impact_momentum_std = round(pd.to_numeric(player_dkhit['impact_momentum'], errors='coerce').std(), 1)
-    attack_angle_std = round(pd.to_numeric(player_dkhit['attack_angle'], errors='coerce').std(), 1)
-    trigger_to_impact_std = round(pd.to_numeric(player_dkhit['trigger_to_impact'], errors='coerce').std(), 1)
+    dk_stats = summary_stats(swing_summaries, ['player']).iloc[0]
+    hand_speed_avg = round(dk_stats['max_hand_speed_mean'], 1)
+    barrel_speed_avg = round(dk_stats['max_barrel_speed_mean'], 1)
+    impact_momentum_avg = round(dk_stats['impact_momentum_mean'], 1)
+    attack_angle_avg = round(dk_stats['attack_angle_mean'], 1)
+    trigger_to_impact_avg = round(dk_stats['trigger_to_impact_mean'], 1)
+    hand_speed_std = round(dk_stats['max_hand_speed_std'], 1)
+    barrel_speed_std = round(dk_stats['max_barrel_speed_std'], 1)
+    impact_momentum_std = round(dk_stats['impact_momentum_std'], 1)
+    attack_angle_std = round(dk_stats['attack_angle_std'], 1)
+    trigger_to_impact_std = round(dk_stats['trigger_to_impact_std'], 1)
     hs_curve = dk_curves_class[dk_curves_class['metric'] == 'hand_speed'].iloc[0]
     bs_curve = dk_curves_class[dk_curves_class['metric'] == 'barrel_speed'].iloc[0]
     im_curve = dk_curves_class[dk_curves_class['metric'] == 'impact_momentum'].iloc[0]
@@ -235,19 +163,15 @@ if len(player_dkhit) > 0:
         'attack_angle'
     ]
 
-    for col in hit_numeric_cols:
-        player_dkhit[col] = pd.to_numeric(player_dkhit[col], errors='coerce')
-
     player_date_dk_stats = (
-        player_dkhit
-        .groupby('created_date')[hit_numeric_cols]
-        .agg(['mean', 'std'])
-        .reset_index()
+        summary_stats(swing_summaries, ['day'])
+        .rename(columns={'day': 'created_date'})
+        .reindex(columns=['created_date'] + [f"{col}_{stat}" for col in hit_numeric_cols for stat in ('mean', 'std')])
+        .assign(created_date=lambda df: pd.to_datetime(df['created_date']))
+        .sort_values('created_date')
+        .reset_index(drop=True)
     )
 
-    # Flatten column names
-    player_date_dk_stats.columns = ['_'.join(col).rstrip('_') for col in player_date_dk_stats.columns.values]
-
 
     curve_lookup = {
         'max_hand_speed': dk_curves_class[dk_curves_class['metric'] == 'hand_speed'].iloc[0],
@@ -273,40 +197,18 @@ player_pitching_video = player_video[player_video['type']=='Pitcher']
 
 #%% Prepare Rapsodo Hitting Stats
 
-# merge player_id onto rapsodo data
-raphit = rapsodo_hitting.merge(players_reset,left_on='Player ID', right_on='rapsodo_id', how='left').rename(columns = {'id':'player_id'})
-player_raphit = raphit[raphit['player_id']==player_select][raphit['ExitVelocity']!="-"]
-player_raphit['Date'] = pd.to_datetime(player_raphit['Date'], errors='coerce')
-player_raphit = player_raphit[
-    (player_raphit['Date'] >= pd.to_datetime(start_date)) & 
-    (player_raphit['Date'] <= pd.to_datetime(end_date))
-]
+# batted balls with an exit velocity in the date range
+raphit_count = summary_count(hitting_summaries, 'ExitVelocity')
 
 
 #%% Prepare Rapsodo Pitching Stats
 def prep_rapsodo_pitching_stats():
-    # merge player_id onto rapsodo data
-    rappitch = rapsodo_pitching.merge(
-        players_reset,left_on='Player ID', right_on='rapsodo_id', how='left'
-        ).rename(columns = {'id':'player_id'})
-
-    pitch_type_replace_dict = {
-        "Fastball": "Four Seam",
-        "Other": "Other",
-        "-": "-",
-        "Splitter": "Splitter",
-        "Slider": "Slider",
-        "Cutter": "Cutter",
-        "ChangeUp": "Changeup",
-        "CurveBall": "Curveball",
-        "TwoSeamFastball": "Two Seam"
-    }
+    summaries = pitching_summaries
 
     # color map by pitch type
     pitch_colors = {
         "Four Seam": "#c63316",
         "Other": "#ffffff",
-        "-": "#ffffff",
         "Splitter": "#fa7100",
         "Slider": "#984893",
         "Cutter": "#4d30ff",
@@ -315,25 +217,20 @@ def prep_rapsodo_pitching_stats():
         "Two Seam": "#4f8fff"
     }
 
-    rappitch["Pitch Type"] = rappitch["Pitch Type"].replace(pitch_type_replace_dict)
-
-    player_rappitch = rappitch[rappitch['player_id']==player_select]
-    player_rappitch['Date'] = pd.to_datetime(player_rappitch['Date'], errors='coerce')
-    player_rappitch = player_rappitch[
-        (player_rappitch['Date'] >= pd.to_datetime(start_date)) & 
-        (player_rappitch['Date'] <= pd.to_datetime(end_date))
-    ]
+    # summaries hold the pitch type normalized at upload (schema.PITCH_TYPE_NAMES), "" when missing
+    summaries = summaries.assign(**{"Pitch Type": summaries["pitch_type"]})
 
     #low_intent exclusion logic
     if exclude_low_intent:
-        player_rappitch = player_rappitch[player_rappitch["Intent Type"]=="high_intent"]
+        summaries = summaries[summaries["intent_type"]=="high"]
+    pitch_count = summary_count(summaries)
 
     # clean up data
-    player_rappitch_clean = player_rappitch[
-        player_rappitch['Pitch Type'].notna() & (player_rappitch['Pitch Type'] != "-") & (player_rappitch['Pitch Type'] != "Other")
+    summaries_clean = summaries[
+        (summaries['Pitch Type'] != "") & (summaries['Pitch Type'] != "Other")
     ]
 
-    # List of columns to convert to numeric
+    # Measurement columns
     numeric_cols = [
         'HB (trajectory)',
         'VB (trajectory)',
@@ -344,65 +241,31 @@ def prep_rapsodo_pitching_stats():
         'Release Height',
         'Release Side'
     ]
+    stat_cols = [f"{col}_{stat}" for col in numeric_cols for stat in ('mean', 'std')]
 
-    # Convert all columns to numeric
-    for col in numeric_cols:
-        player_rappitch_clean[col] = pd.to_numeric(player_rappitch_clean[col], errors='coerce')
-
-    # Group by Pitch Type: calculate mean and std
-    pitch_types_stats = (
-        player_rappitch_clean
-        .groupby('Pitch Type')[numeric_cols]
-        .agg(['mean', 'std'])
-        .reset_index()
+    # By Pitch Type: mean, std and pitch count
+    pitch_types_player_rappitch = (
+        summary_stats(summaries_clean, ['Pitch Type'])
+        .rename(columns={'rows': '#'})
+        .reindex(columns=['Pitch Type'] + stat_cols + ['#'])
     )
-
-    # Flatten multi-index columns
-    pitch_types_stats.columns = ['_'.join(col).rstrip('_') for col in pitch_types_stats.columns.values]
-
-    # Merge counts
-    pitch_counts = (
-        player_rappitch_clean
-        .groupby('Pitch Type')
-        .size()
-        .reset_index(name='#')
-    )
-
-    pitch_types_player_rappitch = pitch_types_stats.merge(pitch_counts, left_on='Pitch Type', right_on='Pitch Type')
     pitch_types_player_rappitch = pitch_types_player_rappitch.sort_values(by='#', ascending=False)
     pitch_types_player_rappitch["color"] = pitch_types_player_rappitch["Pitch Type"].map(pitch_colors)
 
     ### Timeline Data
 
-    pitch_types_by_date_stats = (
-        player_rappitch_clean
-        .groupby(['Date', 'Pitch Type'])[numeric_cols]
-        .agg(['mean', 'std'])
-        .reset_index()
-    )
-
-    # Flatten multi-index columns
-    pitch_types_by_date_stats.columns = ['_'.join(col).rstrip('_') for col in pitch_types_by_date_stats.columns.values]
-
-    # Merge pitch counts by Date + Pitch Type
-    pitch_counts_by_date = (
-        player_rappitch_clean
-        .groupby(['Date', 'Pitch Type'])
-        .size()
-        .reset_index(name='#')
-    )
-
-    # add pitch counts on
-    pitch_types_by_date = pitch_types_by_date_stats.merge(
-        pitch_counts_by_date,
-        left_on=['Date', 'Pitch Type'],
-        right_on=['Date', 'Pitch Type']
+    # By Date + Pitch Type: mean, std and pitch count
+    pitch_types_by_date = (
+        summary_stats(summaries_clean, ['day', 'Pitch Type'])
+        .rename(columns={'day': 'Date', 'rows': '#'})
+        .reindex(columns=['Date', 'Pitch Type'] + stat_cols + ['#'])
+        .assign(Date=lambda df: pd.to_datetime(df['Date']))
     )
 
     # Sort by velo and add colors
     pitch_types_by_date = pitch_types_by_date.sort_values(['Date', 'Velocity_mean'], ascending=[True, False])
     pitch_types_by_date["color"] = pitch_types_by_date["Pitch Type"].map(pitch_colors)
-    return pitch_types_player_rappitch, player_rappitch, pitch_counts, pitch_counts_by_date, pitch_types_by_date, pitch_types_by_date_stats, player_rappitch_clean, pitch_colors
+    return pitch_types_player_rappitch, pitch_count, pitch_types_by_date, pitch_colors
 
 
 #%% Create Hitting and Pitching Tabs
@@ -413,7 +276,7 @@ hitting, pitching = st.tabs(["Hitting", "Pitching"])
 
 with hitting:
     st.header("Hitting Data",divider = "yellow")
-    if len(player_dkhit) == 0 and len(player_raphit) == 0 and len(player_video) == 0:
+    if dk_swing_count == 0 and raphit_count == 0 and len(player_video) == 0:
         st.write('No Hitting Data Available')
     else:
         hitting_charts, hitting_timelines, hitting_videos = st.tabs(["Charts & Data","Timelines","Video"])
@@ -438,7 +301,7 @@ with hitting:
                 st.subheader("Diamond Kinetics Data",divider = "yellow")
 
                 # Generate dk data
-                if len(player_dkhit) < 1:
+                if dk_swing_count < 1:
                     st.write('No Diamond Kinetic Hitting Stats Available')
                 else:
                     dk_df = dk_df.round(1)
@@ -454,12 +317,13 @@ with hitting:
                 st.subheader("Rapsodo Data",divider = "yellow")
                 
                 # Generate rapsodo data
-                if len(player_raphit) < 1:
+                if raphit_count < 1:
                     st.write('No Rapsodo Hitting Stats Available')
                 else:
-                    ev_max = max(pd.to_numeric(player_raphit['ExitVelocity'], errors='coerce'))
-                    ev_avg = round(pd.to_numeric(player_raphit['ExitVelocity'], errors='coerce').mean(), 1)
-                    ev_90 = round(np.percentile(pd.to_numeric(player_raphit['ExitVelocity'], errors='coerce').dropna(), 90), 1)
+                    raphit_stats = summary_stats(hitting_summaries, ['player']).iloc[0]
+                    ev_max = raphit_stats['ExitVelocity_max']
+                    ev_avg = round(raphit_stats['ExitVelocity_mean'], 1)
+                    ev_90 = round(raphit_stats['ExitVelocity_90'], 1)
                     rap_df = pd.DataFrame({
                         'Metric': ['Max EV', '90th pct EV', 'Average EV'],
                         'Value': [ev_max, ev_90, ev_avg]
@@ -469,7 +333,7 @@ with hitting:
         #%% Hitting Timelines
         with hitting_timelines:
             st.subheader("Diamond Kinetics Metric by Date",divider = "yellow")
-            if len(player_dkhit) == 0:
+            if dk_swing_count == 0:
                 st.write('No Diamond Kinetic Hitting Stats Available')
             else:
                 metric_map = {
@@ -580,15 +444,11 @@ with pitching:
     exclude_low_intent = st.toggle("Exclude Low Intent Pitches?",value=True)
     (
         pitch_types_player_rappitch,
-        player_rappitch,
-        pitch_counts,
-        pitch_counts_by_date,
+        pitch_count,
         pitch_types_by_date,
-        pitch_types_by_date_stats,
-        player_rappitch_clean,
         pitch_colors
     ) = prep_rapsodo_pitching_stats()
-    if len(player_rappitch) == 0 and len(player_pitching_video) == 0:
+    if pitch_count == 0 and len(player_pitching_video) == 0:
         st.write("No Pitching Data Available")
     else:
         charts, timelines, pitching_videos = st.tabs(["Charts & Data","Timelines", "Video"])
@@ -1,7 +1,7 @@
 #%% Imports
 
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import get_db, fetch_table_data, insert_rows, diff_rows, upsert_rows, get_roster
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -12,86 +12,19 @@ import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 
 #%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
+db = get_db()
 
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
 # Fetch data from all tables, then align id to supabase index
 players = fetch_table_data('players')
-users = fetch_table_data('users')
-rapsodo_hitting = fetch_table_data('rapsodo_hitting')
-rapsodo_pitching = fetch_table_data('rapsodo_pitching')
-swings = fetch_table_data('swings')
 
 #%% Data Adjustments
 
-# assign class levels to index of years
-classdict = {
-        0: "Grad",
-        1: "Senior",
-        2: "Junior",
-        3: "Sophomore",
-        4: "Freshman",
-        5: "Middle"
-}
-
-# create the display version of players
-players_show = players.copy()
-
-# assign class year names to each player based on graduation year
-def classdef(df):
-    class_years = []
-    for grad_year in df['grad_year']:
-        if isinstance(grad_year, Decimal):
-            grad_year = int(grad_year)
-        # Calculate difference in years between grad date and today
-        years_diff = math.ceil((date(grad_year, 9, 1) - date.today()).days / 365)
-        # Cap within 0–5
-        if years_diff >= 5:
-            years_diff = 5
-        elif years_diff < 1:
-            years_diff = 0
-        # Look up label from classdict
-        class_year = classdict.get(years_diff, "Unknown")
-        class_years.append(class_year)
-    # Assign back to the DataFrame
-    df['class'] = class_years
-
-# Run the function on your display DataFrame
-classdef(players_show)
-
-# Create Players Full Name Column
-players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
-
-# assign player active status by class
-active_classes = ['Freshman','Sophomore','Junior','Senior']
-players_show['active'] = players_show['class'].isin(active_classes)
-
-# create currentplayers table
-currentplayers = players_show.query('active == True')
-
-# Prepare dropdown options
-player_options = players_show['full_name'].to_dict()
+roster = get_roster()
+players_show = roster['players_show']
+currentplayers = roster['currentplayers']
+player_options = roster['player_options']
 
 #%% Home Page
  
@@ -125,7 +58,8 @@ if ptoggle:
         'class': 'Grade Level'
     }, inplace=True)
 else:
-    fplayers = filtered_players[['first_name','last_name','class','pos_1','pos_2','pos_3']].fillna('')
+    # positions are categorical, so go back to plain values before blanking the missing ones
+    fplayers = filtered_players[['first_name','last_name','class','pos_1','pos_2','pos_3']].astype(object).fillna('')
     fplayers.rename(columns={
         'first_name': 'First Name',
         'last_name': 'Last Name',
@@ -150,26 +84,24 @@ def clean_value(v):
     return v
 
 if edit_toggle:
-    players_update = st.data_editor(players)
+    # plain values for the positions too, or the editor would only offer positions some player already has
+    players_edit = players.astype({column: object for column in ['pos_1', 'pos_2', 'pos_3']})
+    players_update = st.data_editor(players_edit)
     save = st.button("Save")
 
     if save:
-        for idx, row in players_update.iterrows():
-            player_id = row.name
-
-            clean_row = {k: clean_value(v) for k, v in row.items()}
+        # only rows with an edited cell are sent, all in one upsert
+        changed_players = diff_rows(players_edit, players_update)
+        changed_rows = [
+            {"id": clean_value(player_id), **{k: clean_value(v) for k, v in row.items()}}
+            for player_id, row in changed_players.iterrows()
+        ]
 
-            # Skip empty dicts (no data)
-            if clean_row:
-                response = (
-                    db.table("players")
-                    .update(clean_row)
-                    .eq("id", player_id)
-                    .execute()
-                )
+        if changed_rows:
+            response = upsert_rows("players", changed_rows)
 
         st.session_state.form_submitted = True
-        st.success("Data successfully saved")
+        st.success(f"Data successfully saved ({len(changed_rows)} players changed)")
 
 
 else:
@@ -214,7 +146,7 @@ if player_submit:
         "pos_3": clean_value(pos_3),
         "rapsodo_id": clean_value(rapsodo_id),
     }
-    response = db.client.table("players").insert(new_player).execute()
+    response = insert_rows("players", new_player)
     new_player_id = response.data[0]["id"]
     new_user = {
         "email": clean_value(email),
@@ -1,7 +1,7 @@
 #%% Imports
 
 import streamlit as st
-from st_supabase_connection import SupabaseConnection
+from data_access import ACTIVE_CLASSES, fetch_table_data, dk_leaderboard, rapsodo_hitting_leaderboard, rapsodo_release_leaderboard, rapsodo_id_text, get_roster
 import pandas as pd
 import numpy as np
 from datetime import date, time, datetime
@@ -13,87 +13,19 @@ import matplotlib.colors as mcolors
 from matplotlib.ticker import MultipleLocator
 from dateutil.relativedelta import relativedelta
 
-#%% Connect to Supabase
-db = st.connection("supabase",type=SupabaseConnection)
-
 #%% Data Retrieval
 
-# Function to fetch data from any table
-def fetch_table_data(table_name):
-    response = db.client.table(table_name).select("*").execute()
-
-    # Supabase v2 client: actual rows are in response.data
-    data = response.data
-    if not data:
-        st.warning(f"No data returned from table '{table_name}'.")
-        return pd.DataFrame()
-
-    # Normalize into DataFrame
-    df = pd.DataFrame(data)
-
-   # Set index to 'id' if it exists, otherwise 'uuid'
-    if 'id' in df.columns:
-        df.set_index('id', inplace=True)
-    elif 'uuid' in df.columns:
-        df.set_index('uuid', inplace=True)
-    return df
-
 # Fetch data from all tables, then align id to supabase index
+# (swings and rapsodo are aggregated per player in the database, see data_access/sql/leaderboards.sql)
 players = fetch_table_data('players')
-rapsodo_hitting = fetch_table_data('rapsodo_hitting')
-rapsodo_pitching = fetch_table_data('rapsodo_pitching')
-swings = fetch_table_data('swings')
-dk_curves = fetch_table_data('dk_curves')
 
 #%% Data Adjustments
 
-# assign class levels to index of years
-classdict = {
-        0: "Grad",
-        1: "Senior",
-        2: "Junior",
-        3: "Sophomore",
-        4: "Freshman",
-        5: "Middle"
-}
-
-# create the display version of players
-players_show = players.copy()
-
-# assign class year names to each player based on graduation year
-def classdef(df):
-    class_years = []
-    for grad_year in df['grad_year']:
-        if isinstance(grad_year, Decimal):
-            grad_year = int(grad_year)
-        # Calculate difference in years between grad date and today
-        years_diff = math.ceil((date(grad_year, 9, 1) - date.today()).days / 365)
-        # Cap within 0–5
-        if years_diff >= 5:
-            years_diff = 5
-        elif years_diff < 1:
-            years_diff = 0
-        # Look up label from classdict
-        class_year = classdict.get(years_diff, "Unknown")
-        class_years.append(class_year)
-    # Assign back to the DataFrame
-    df['class'] = class_years
-
-# Run the function on your display DataFrame
-classdef(players_show)
-
-# Create Players Full Name Column
-players_show['full_name'] = players_show['first_name'] + ' ' + players_show['last_name']
-
-# assign player active status by class
-active_classes = ['Freshman','Sophomore','Junior','Senior']
-players_show['active'] = players_show['class'].isin(active_classes)
-
-# create currentplayers table
-currentplayers = players_show.query('active == True')
-
-# Prepare dropdown options
-player_options = players_show['full_name'].to_dict()
+roster = get_roster()
+players_show = roster['players_show']
+currentplayers = roster['currentplayers']
+player_options = roster['player_options']
+active_classes = ACTIVE_CLASSES
 
 #%% Leaderboard Page
 
@@ -138,51 +70,8 @@ if classes_select:
 
 #%% Prepare DK Data
 
-
-# filter data by dates selected
-swings['created_date'] = pd.to_datetime(swings['created_date'], errors='coerce')
-filtered_swings = swings[
-    (swings['created_date'] >= pd.to_datetime(start_date)) & 
-    (swings['created_date'] <= pd.to_datetime(end_date)) &
-    (swings['player_id'].isin(filtered_players['id']))
-]
-
-# merge for id purposes
-dkhit = filtered_swings.merge(filtered_players,left_on='player_id', right_on='id', how='left')
-
-# group by id
-dkhit_group = dkhit.groupby('player_id').agg(
-    hand_speed_max=('max_hand_speed', 'max'),
-    hand_speed_avg=('max_hand_speed', 'mean'),
-    hand_speed_90=('max_hand_speed', lambda x: np.percentile(x, 90)),
-    hand_speed_std=('max_hand_speed', 'std'),
-
-    barrel_speed_max=('max_barrel_speed', 'max'),
-    barrel_speed_avg=('max_barrel_speed', 'mean'),
-    barrel_speed_90=('max_barrel_speed', lambda x: np.percentile(x, 90)),
-    barrel_speed_std=('max_barrel_speed', 'std'),
-
-    attack_angle_avg=('attack_angle', 'mean'),
-    attack_angle_std=('attack_angle', 'std'),
-
-    impact_momentum_avg=('impact_momentum', 'mean'),
-    impact_momentum_std=('impact_momentum', 'std'),
-
-    trigger_to_impact_avg=('trigger_to_impact', 'mean'),
-    trigger_to_impact_std=('trigger_to_impact', 'std'),
-
-    hand_cast_avg=('hand_cast', 'mean'),
-    hand_cast_std=('hand_cast', 'std'),
-
-    barrel_x_avg=('barrel_x', 'mean'),
-    barrel_x_std=('barrel_x', 'std'),
-
-    barrel_y_avg=('barrel_y', 'mean'),
-    barrel_y_std=('barrel_y', 'std'),
-
-    barrel_z_avg=('barrel_z', 'mean'),
-    barrel_z_std=('barrel_z', 'std')
-).reset_index()
+# per-player aggregates for the selected dates and players
+dkhit_group = dk_leaderboard(start_date, end_date, filtered_players['id'])
 
 # join full_name back on
 dkhit_group = dkhit_group.merge(
@@ -234,23 +123,11 @@ dkhit_group = dkhit_group.round(2)
 
 #%% Prepare Rapsodo Hitting Data
 
-# filter data by dates selected
-rapsodo_hitting['Date'] = pd.to_datetime(rapsodo_hitting['Date'], errors='coerce')
-filtered_rapsodo_hitting = rapsodo_hitting[
-    (rapsodo_hitting['Date'] >= pd.to_datetime(start_date)) & 
-    (rapsodo_hitting['Date'] <= pd.to_datetime(end_date))
-]
+# rapsodo ids are matched as text, since they're stored as numbers in some tables and text in others
+players_show['rapsodo_id'] = players_show['rapsodo_id'].map(lambda rapsodo_id: rapsodo_id_text(rapsodo_id) if pd.notna(rapsodo_id) else None)
 
-# merge for id purposes
-raphit = filtered_rapsodo_hitting.merge(filtered_players,left_on='Player ID', right_on='rapsodo_id', how='left')
-raphit['ExitVelocity'] = pd.to_numeric(raphit['ExitVelocity'], errors='coerce')[raphit['ExitVelocity']!="-"]
-
-# group by id
-raphit_group = raphit.groupby('rapsodo_id').agg(
-    ExitVelocity_max=('ExitVelocity', 'max'),
-    ExitVelocity_avg=('ExitVelocity', 'mean'),
-    ExitVelocity_90th_percentile=('ExitVelocity', lambda x: np.percentile(x, 90))
-).reset_index()
+# per-player aggregates for the selected dates and players
+raphit_group = rapsodo_hitting_leaderboard(start_date, end_date, filtered_players['rapsodo_id'])
 
 # join full_name back on
 raphit_group = raphit_group.merge(
@@ -284,44 +161,15 @@ def highlight_ev(df):
 
 #%% Prepare Rapsodo Pitching Data
 
-# Merge player data
-rappitch = rapsodo_pitching.merge(
-    players_reset, left_on='Player ID', right_on='rapsodo_id', how='left'
-).rename(columns={'id': 'player_id'})
-
-# Convert Date
-rappitch['Date'] = pd.to_datetime(rappitch['Date'], errors='coerce')
-rappitch = rappitch[
-    (rappitch['Date'] >= pd.to_datetime(start_date)) &
-    (rappitch['Date'] <= pd.to_datetime(end_date))
-]
-
-# Clean up data (no need to filter by pitch type)
-numeric_cols = [
-    'HB (trajectory)',
-    'VB (trajectory)',
-    'Velocity',
-    'Total Spin',
-    'Spin Efficiency (release)',
-    'Release Angle',
-    'Release Height',
-    'Release Side'
-]
-
-# Convert to numeric
-for col in numeric_cols:
-    rappitch[col] = pd.to_numeric(rappitch[col], errors='coerce')
-
-# Group by player
-player_release_stats = (
-    rappitch
-    .groupby('full_name')[['Release Side', 'Release Height']]
-    .agg(['mean'])
-    .reset_index()
-)
+# average release point per pitcher for the selected dates
+player_release_stats = rapsodo_release_leaderboard(start_date, end_date, players_reset['rapsodo_id'])
 
-# Flatten multi-index columns
-player_release_stats.columns = ['_'.join(col).rstrip('_') for col in player_release_stats.columns.values]
+# join full_name back on
+player_release_stats = player_release_stats.merge(
+    players_show[['rapsodo_id', 'full_name']],
+    on='rapsodo_id',
+    how='left'
+)
 
 
 #%% Display leaderboard